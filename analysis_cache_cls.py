@@ -0,0 +1,82 @@
+import json
+import os
+from collections import OrderedDict
+
+
+CACHE_FILE = "analysis_cache.json"
+CACHE_SIZE = 1000  # Default number of puzzles kept in cache
+
+
+class AnalysisCache():
+    """Least recently used cache with results of puzzle analysis.
+
+    key = puzzle hash from Canonicalizer (same for all equivalent puzzles)
+    entry (dict):
+        solution (list): solution in canonical coordinates and labels (None if there is none)
+        count (int): number of solutions (counting stops at 2)
+        rating (dict): rating of canonical puzzle from PuzzleRater
+    When cache is full, least recently used entry is removed.
+    hits and misses count get() calls.
+    """
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries
+
+    @max_entries.setter
+    def max_entries(self, value: int):
+        self._max_entries = max(0, value)
+        self._evict()
+
+    def get(self, key: str) -> dict:
+        """Returns entry, or None if puzzle is not in cache."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def clear(self):
+        self._entries.clear()
+
+    def _evict(self):
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def load(self, path: str = CACHE_FILE) -> bool:
+        """Adds entries from file, returns False if file does not exist or is not valid."""
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return False
+        if not isinstance(data, list):
+            return False
+        # File is ordered from least to most recently used
+        for item in data:
+            if isinstance(item, list) and len(item) == 2 and isinstance(item[1], dict):
+                self._entries[item[0]] = item[1]
+        self._evict()
+        return True
+
+    def save(self, path: str = CACHE_FILE):
+        """Writes cache to temporary file and renames it, so file is never half written."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump([[key, entry] for key, entry in self._entries.items()], file)
+        os.replace(tmp_path, path)
@@ -0,0 +1,117 @@
+import geometry_cls
+import candidates_cls
+
+
+class SearchStopped(Exception):
+    """Raised inside search when stop event is set by another worker."""
+
+
+class NodeLimit():
+    """Stop event that is set after search has visited 'nodes' nodes.
+    Solver must check it in every node (check_every=1). Unlike a time limit,
+    result of search does not depend on speed of computer.
+    """
+    def __init__(self, nodes: int):
+        self.nodes = nodes
+        self.visited = 0
+
+    def is_set(self) -> bool:
+        self.visited += 1
+        return self.visited > self.nodes
+
+    @property
+    def exceeded(self) -> bool:
+        return self.visited > self.nodes
+
+
+class BacktrackingSolver():
+    """Depth first search with singles propagation in every node.
+
+    Branches on empty cell with fewest candidates.
+    Search can be stopped from outside with 'stop_event' (any object with
+    is_set() method, e.g. multiprocessing.Event), it is checked every
+    'check_every' nodes.
+    """
+    def __init__(self, geometry: geometry_cls.Geometry, check_every: int = 64):
+        self.geometry = geometry
+        self.check_every = check_every
+        self._cand = candidates_cls.CandidateMasks(geometry)
+        self._solutions = []
+        self._limit = 1
+        self._stop_event = None
+        self._nodes = 0
+
+    def solve(self, values: list, limit: int = 1, stop_event=None) -> list:
+        """Returns list with up to 'limit' solutions of board.
+        If search is stopped by 'stop_event', returns solutions found so far.
+        """
+        cand = self._cand
+        cand.load(values)
+        if cand.has_conflicts():
+            return []
+        self._solutions = []
+        self._limit = limit
+        self._stop_event = stop_event
+        self._nodes = 0
+        try:
+            self._search(None)
+        except SearchStopped:
+            pass
+        self._stop_event = None
+        return self._solutions
+
+    def count(self, values: list, limit: int = 2, stop_event=None) -> int:
+        """Returns number of solutions, counting stops at 'limit'."""
+        return len(self.solve(values, limit, stop_event))
+
+    def split(self, values: list, depth: int) -> list:
+        """Splits search tree at first 'depth' branching cells.
+        Returns list of boards (subtrees), together they have all solutions of board.
+        """
+        cand = self._cand
+        frontier = [list(values)]
+        for level in range(0, depth):
+            next_frontier = []
+            for board in frontier:
+                cand.load(board)
+                if cand.has_conflicts():
+                    continue
+                is_consistent, assigned = cand.propagate()
+                if not is_consistent:
+                    continue
+                index = cand.fewest_candidates_cell()
+                if index < 0:
+                    next_frontier.append(list(cand.values))
+                    continue
+                for value in candidates_cls.mask_to_vals(cand.candidates(index)):
+                    child = list(cand.values)
+                    child[index] = value
+                    next_frontier.append(child)
+            frontier = next_frontier
+        return frontier
+
+    def _search(self, units) -> bool:
+        """Returns True when search should end (limit reached)."""
+        cand = self._cand
+        if self._stop_event is not None:
+            self._nodes += 1
+            if self._nodes % self.check_every == 0 and self._stop_event.is_set():
+                raise SearchStopped()
+        is_consistent, assigned = cand.propagate(units)
+        done = False
+        if is_consistent:
+            index = cand.fewest_candidates_cell()
+            if index < 0:
+                self._solutions.append(list(cand.values))
+                done = len(self._solutions) >= self._limit
+            else:
+                for value in candidates_cls.mask_to_vals(cand.candidates(index)):
+                    cand.set_val(index, value)
+                    done = self._search(cand.touched_units(index))
+                    cand.set_val(index, 0)
+                    if done:
+                        break
+        # Undo propagation
+        for index in reversed(assigned):
+            cand.set_val(index, 0)
+        return done
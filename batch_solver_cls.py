@@ -0,0 +1,142 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import geometry_cls
+
+
+INVALID = -1  # Board has repeated value, value out of range or no solution
+UNSOLVED = 0  # Board is consistent but not full
+SOLVED = 1  # Board is full and valid
+
+
+class BatchSolver():
+    """Validates and solves many boards at once with NumPy.
+
+    boards = integer array with shape (N, rows, cols), 0 = empty cell
+    Candidate masks use bit (v - 1) for value v, the same as CandidateMasks.
+    Singles propagation runs on the whole batch, boards that are still
+    unsolved after it are handed to scalar solver one by one.
+    scalar_solver = object with solve(values) -> solution list or None
+        (e.g. backend from SolverRegistry)
+    """
+    def __init__(self, geometry: geometry_cls.Geometry, scalar_solver=None):
+        if np is None:
+            raise ImportError("BatchSolver requires numpy")
+        self.geometry = geometry
+        self.scalar_solver = scalar_solver
+        self._units = np.array(geometry.units, dtype=np.intp)  # (units, size)
+        # (cells, units of cell), cells on diagonals have more units, others repeat their first unit
+        most = max(len(units) for units in geometry.cell_units)
+        self._cell_units = np.array([units + (units[0],) * (most - len(units)) for units in geometry.cell_units], dtype=np.intp)
+        self._value_bits = np.arange(0, geometry.size, dtype=np.int64)
+
+    def _flat(self, boards) -> "np.ndarray":
+        geo = self.geometry
+        boards = np.asarray(boards, dtype=np.int64)
+        return boards.reshape(boards.shape[0], geo.cells)
+
+    def _bits(self, flat) -> "np.ndarray":
+        # Value -> bit mask, 0 for empty cell
+        return np.where(flat > 0, np.left_shift(1, np.clip(flat - 1, 0, None)), 0)
+
+    def _popcount(self, masks) -> "np.ndarray":
+        count = np.zeros(masks.shape, dtype=np.int64)
+        for bit in range(0, self.geometry.size):
+            count += (masks >> bit) & 1
+        return count
+
+    def _unit_masks(self, flat) -> "np.ndarray":
+        return np.bitwise_or.reduce(self._bits(flat)[:, self._units], axis=2)
+
+    def validate(self, boards) -> "np.ndarray":
+        """Returns status of every board (INVALID, UNSOLVED or SOLVED)."""
+        flat = self._flat(boards)
+        return self._validate_flat(flat)
+
+    def _validate_flat(self, flat) -> "np.ndarray":
+        geo = self.geometry
+        out_of_range = ((flat < 0) | (flat > geo.size)).any(axis=1)
+        unit_values = flat[:, self._units]
+        filled = (unit_values > 0).sum(axis=2)
+        distinct = self._popcount(self._unit_masks(np.where(out_of_range[:, None], 0, flat)))
+        repeated = (filled != distinct).any(axis=1)
+        full = (flat > 0).all(axis=1)
+        status = np.where(full, SOLVED, UNSOLVED)
+        status[out_of_range | repeated] = INVALID
+        return status
+
+    def candidate_masks(self, boards) -> "np.ndarray":
+        """Returns (N, rows, cols) array with candidate mask of every cell (0 for filled cell)."""
+        flat = self._flat(boards)
+        return self._candidates_flat(flat).reshape(np.asarray(boards).shape)
+
+    def _candidates_flat(self, flat) -> "np.ndarray":
+        unit_masks = self._unit_masks(flat)
+        used = np.bitwise_or.reduce(unit_masks[:, self._cell_units], axis=2)
+        candidates = self.geometry.full_mask & ~used
+        candidates[flat > 0] = 0
+        return candidates
+
+    def propagate(self, boards) -> tuple:
+        """Applies naked and hidden singles to all boards until nothing changes.
+        Returns (boards (N, rows, cols), status)
+        """
+        shape = np.asarray(boards).shape
+        flat = self._flat(boards).copy()
+        status = self._propagate_flat(flat)
+        return (flat.reshape(shape), status)
+
+    def _propagate_flat(self, flat) -> "np.ndarray":
+        geo = self.geometry
+        status = self._validate_flat(flat)
+        active = status == UNSOLVED
+        while active.any():
+            rows = np.nonzero(active)[0]
+            work = flat[rows]
+            candidates = self._candidates_flat(work)
+            empty = work == 0
+            # Empty cell without candidates
+            dead = (empty & (candidates == 0)).any(axis=1)
+            # Naked singles
+            naked = empty & (candidates != 0) & ((candidates & (candidates - 1)) == 0)
+            new_work = np.where(naked, self._popcount(candidates - 1) + 1, work)
+            # Hidden singles, value with only one place in unit
+            unit_candidates = candidates[:, self._units]  # (n, units, size)
+            has_value = (unit_candidates[..., None] >> self._value_bits) & 1  # (n, units, size, values)
+            places = has_value.sum(axis=2)  # (n, units, values)
+            placed = (self._unit_masks(work)[..., None] >> self._value_bits) & 1
+            # Value that is not placed and has no place in unit
+            dead |= ((places == 0) & (placed == 0)).any(axis=(1, 2))
+            board_idx, unit_idx, value_idx = np.nonzero(places == 1)
+            if board_idx.size:
+                position = has_value[board_idx, unit_idx, :, value_idx].argmax(axis=1)
+                cells = self._units[unit_idx, position]
+                new_work[board_idx, cells] = value_idx + 1
+            changed = (new_work != work).any(axis=1)
+            flat[rows] = new_work
+            new_status = self._validate_flat(new_work)
+            new_status[dead] = INVALID
+            status[rows] = new_status
+            active[rows] = (new_status == UNSOLVED) & changed
+        return status
+
+    def solve(self, boards) -> tuple:
+        """Solves all boards.
+        Propagation runs on whole batch, remaining boards go to scalar solver.
+        Returns (boards (N, rows, cols), status), unsolved boards get INVALID
+        if scalar solver finds no solution, without scalar solver they stay UNSOLVED.
+        """
+        shape = np.asarray(boards).shape
+        flat = self._flat(boards).copy()
+        status = self._propagate_flat(flat)
+        if self.scalar_solver is not None:
+            for row in np.nonzero(status == UNSOLVED)[0]:
+                solution = self.scalar_solver.solve([int(value) for value in flat[row]])
+                if solution is None:
+                    status[row] = INVALID
+                else:
+                    flat[row] = solution
+                    status[row] = SOLVED
+        return (flat.reshape(shape), status)
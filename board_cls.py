@@ -0,0 +1,95 @@
+PREDEFINED = 1  # Value is shown on board from start
+EDITED = 2  # User entered data in cell
+CORRECT = 4  # User data is correct
+
+
+def make_flags(predefined: bool = False, edited: bool = False, correct: bool = False) -> int:
+    flags = 0
+    if predefined:
+        flags |= PREDEFINED
+    if edited:
+        flags |= EDITED
+    if correct:
+        flags |= CORRECT
+    return flags
+
+
+class Board():
+    """Compact game board.
+
+    values (bytearray): value of every cell, index = y * width + x (0 = empty)
+    flags (bytearray): PREDEFINED, EDITED and CORRECT bits of every cell
+    solution (bytearray): solved board
+    """
+    __slots__ = ("width", "height", "values", "flags", "solution")
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.values = bytearray(width * height)
+        self.flags = bytearray(width * height)
+        self.solution = bytearray(width * height)
+
+    def set(self, index: int, value: int, flags: int):
+        self.values[index] = value
+        self.flags[index] = flags
+
+    def is_predefined(self, index: int) -> bool:
+        return bool(self.flags[index] & PREDEFINED)
+
+    def copy(self) -> "Board":
+        board = Board.__new__(Board)
+        board.width = self.width
+        board.height = self.height
+        board.values = bytearray(self.values)
+        board.flags = bytearray(self.flags)
+        board.solution = bytearray(self.solution)
+        return board
+
+    def snapshot(self) -> bytes:
+        """Returns values and flags as one bytes object."""
+        return bytes(self.values) + bytes(self.flags)
+
+    def restore(self, snapshot: bytes):
+        cells = self.width * self.height
+        self.values[:] = snapshot[:cells]
+        self.flags[:] = snapshot[cells:]
+
+    def view(self) -> "BoardView":
+        return BoardView(self)
+
+
+class BoardView():
+    """Read only view of board for rendering.
+    view[y][x] = (value, predefined, edited, correct)
+    """
+    __slots__ = ("_board",)
+
+    def __init__(self, board: Board):
+        self._board = board
+
+    def __len__(self) -> int:
+        return self._board.height
+
+    def __getitem__(self, y: int) -> "BoardRowView":
+        if not 0 <= y < self._board.height:
+            raise IndexError("Board row out of range")
+        return BoardRowView(self._board, y)
+
+
+class BoardRowView():
+    __slots__ = ("_board", "_start")
+
+    def __init__(self, board: Board, y: int):
+        self._board = board
+        self._start = y * board.width
+
+    def __len__(self) -> int:
+        return self._board.width
+
+    def __getitem__(self, x: int) -> tuple:
+        if not 0 <= x < self._board.width:
+            raise IndexError("Board column out of range")
+        index = self._start + x
+        flags = self._board.flags[index]
+        return (self._board.values[index], bool(flags & PREDEFINED), bool(flags & EDITED), bool(flags & CORRECT))
@@ -0,0 +1,240 @@
+from collections import deque
+import geometry_cls
+
+
+_mask_values_cache = {}
+
+
+def mask_to_vals(mask: int) -> tuple:
+    """Returns tuple of values whose bits are set in mask (bit 0 = value 1)."""
+    vals = _mask_values_cache.get(mask)
+    if vals is None:
+        vals = []
+        value = 1
+        tmp = mask
+        while tmp:
+            if tmp & 1:
+                vals.append(value)
+            tmp >>= 1
+            value += 1
+        vals = tuple(vals)
+        if len(_mask_values_cache) < 65536:
+            _mask_values_cache[mask] = vals
+    return vals
+
+
+def count_bits(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+class CandidateMasks():
+    """Keeps occupancy bitmasks for every row, column and block of the board.
+
+    Value v is stored as bit (1 << (v - 1)).
+    _counts[unit][v] = how many times value v is in unit, so the masks stay
+    correct even when the user enters the same value twice in one unit.
+    Candidates of any cell are then just AND/NOT of the masks of its units.
+    empty = number of empty cells
+    conflicts = number of repeated values in all units (value that is 3 times
+        in unit counts as 2 conflicts)
+    Both counters are updated in set_val, so validity checks are O(1).
+    """
+    def __init__(self, geometry: geometry_cls.Geometry):
+        self.geometry = geometry
+        self.values = []  # Flat list with values of all cells
+        self._masks = []  # Occupancy bitmask for every unit
+        self._counts = []  # Count of every value in every unit
+        self.empty = 0
+        self.conflicts = 0
+        self.reset()
+
+    def reset(self):
+        geo = self.geometry
+        self.values = [0] * geo.cells
+        self._masks = [0] * len(geo.units)
+        self._counts = [[0] * (geo.size + 1) for unit in geo.units]
+        self.empty = geo.cells
+        self.conflicts = 0
+
+    def load(self, values: list):
+        self.reset()
+        for index, value in enumerate(values):
+            if value:
+                self.set_val(index, value)
+
+    def set_val(self, index: int, value: int):
+        old_val = self.values[index]
+        if old_val == value:
+            return
+        self.values[index] = value
+        if not old_val:
+            self.empty -= 1
+        elif not value:
+            self.empty += 1
+        masks = self._masks
+        counts = self._counts
+        for unit in self.geometry.cell_units[index]:
+            unit_counts = counts[unit]
+            if old_val:
+                unit_counts[old_val] -= 1
+                if unit_counts[old_val]:
+                    self.conflicts -= 1
+                else:
+                    masks[unit] &= ~(1 << (old_val - 1))
+            if value:
+                if unit_counts[value]:
+                    self.conflicts += 1
+                unit_counts[value] += 1
+                masks[unit] |= 1 << (value - 1)
+
+    def used_mask(self, index: int) -> int:
+        """Returns mask of values used by peers of cell (cell itself is ignored)."""
+        value = self.values[index]
+        masks = self._masks
+        used = 0
+        if value:
+            bit = 1 << (value - 1)
+            counts = self._counts
+            for unit in self.geometry.cell_units[index]:
+                if counts[unit][value] == 1:
+                    used |= masks[unit] & ~bit
+                else:
+                    used |= masks[unit]
+        else:
+            for unit in self.geometry.cell_units[index]:
+                used |= masks[unit]
+        return used
+
+    def candidates(self, index: int) -> int:
+        """Returns mask of values that can be written in cell."""
+        return self.geometry.full_mask & ~self.used_mask(index)
+
+    def propagate(self, units: list = None, stop_index: int = -1) -> tuple:
+        """Applies naked and hidden singles until queue with units is empty.
+        units = units to start with (default all units)
+        stop_index = propagation ends as soon as value is written in this cell
+        After assignment, units of the cell and units of its empty peers that
+        lost a candidate are queued again.
+        Returns (is_consistent (bool), assigned (list with changed cell indexes))
+        Caller can undo propagation by setting assigned cells back to 0.
+        """
+        geo = self.geometry
+        values = self.values
+        full_mask = geo.full_mask
+        masks = self._masks
+        cell_units = geo.cell_units
+        if units is None:
+            units = range(0, len(geo.units))
+        queued = bytearray(len(geo.units))
+        queue = deque()
+        for unit in units:
+            if not queued[unit]:
+                queued[unit] = 1
+                queue.append(unit)
+        assigned = []
+        while queue:
+            unit = queue.popleft()
+            queued[unit] = 0
+            seen_once = 0
+            seen_more = 0
+            empty = []
+            for index in geo.units[unit]:
+                if values[index]:
+                    continue
+                # Same as self.candidates(index), inlined for empty cell
+                used = 0
+                for cell_unit in cell_units[index]:
+                    used |= masks[cell_unit]
+                candidates = full_mask & ~used
+                if not candidates:
+                    return (False, assigned)
+                if not candidates & (candidates - 1):
+                    # Naked single
+                    self.set_val(index, candidates.bit_length())
+                    assigned.append(index)
+                    if index == stop_index:
+                        return (True, assigned)
+                    for changed_unit in self.touched_units(index):
+                        if not queued[changed_unit]:
+                            queued[changed_unit] = 1
+                            queue.append(changed_unit)
+                    continue
+                seen_more |= seen_once & candidates
+                seen_once |= candidates
+                empty.append(index)
+            placed = masks[unit]
+            if (seen_once | placed) != full_mask:
+                # Some value has no place in unit
+                return (False, assigned)
+            singles = seen_once & ~seen_more & ~placed
+            if not singles:
+                continue
+            for index in empty:
+                if values[index]:
+                    continue
+                value_mask = self.candidates(index) & singles
+                if not value_mask:
+                    continue
+                if value_mask & (value_mask - 1):
+                    # Two values can go only in this cell
+                    return (False, assigned)
+                # Hidden single
+                self.set_val(index, value_mask.bit_length())
+                assigned.append(index)
+                if index == stop_index:
+                    return (True, assigned)
+                for changed_unit in self.touched_units(index):
+                    if not queued[changed_unit]:
+                        queued[changed_unit] = 1
+                        queue.append(changed_unit)
+        return (True, assigned)
+
+    def touched_units(self, index: int) -> set:
+        """Units where candidates changed after value was written in cell:
+        units of the cell and units of empty peers that had this value as candidate.
+        """
+        cell_units = self.geometry.cell_units
+        values = self.values
+        masks = self._masks
+        own_units = cell_units[index]
+        bit = 1 << (values[index] - 1)
+        units = set(own_units)
+        for peer in self.geometry.peers[index]:
+            if values[peer]:
+                continue
+            blocked = 0
+            for unit in cell_units[peer]:
+                if unit not in own_units:
+                    blocked |= masks[unit]
+            if not blocked & bit:
+                units.update(cell_units[peer])
+        return units
+
+    def fewest_candidates_cell(self) -> int:
+        """Returns empty cell with fewest candidates, or -1 if board is full.
+        Search stops at first cell with one or no candidate.
+        """
+        values = self.values
+        best_index = -1
+        best_count = self.geometry.size + 1
+        for index in range(0, self.geometry.cells):
+            if values[index]:
+                continue
+            count = count_bits(self.candidates(index))
+            if count < best_count:
+                best_index = index
+                best_count = count
+                if count <= 1:
+                    break
+        return best_index
+
+    def unit_mask(self, unit: int) -> int:
+        return self._masks[unit]
+
+    def has_conflicts(self) -> bool:
+        """True if some value is repeated in some unit."""
+        return self.conflicts > 0
+
+    def is_valid(self) -> bool:
+        """True if board is full and no value is repeated in any unit."""
+        return not self.empty and not self.conflicts
@@ -0,0 +1,232 @@
+import geometry_cls
+
+
+class DLXSolver():
+    """Exact cover sudoku solver (Knuth's Algorithm X with dancing links).
+
+    Matrix columns:
+        one column for every cell (cell must have a value)
+        one column for every unit and value (value must be in unit)
+    Matrix rows:
+        one row for every cell and value
+
+    Links are kept in flat lists (L, R, U, D, C) instead of node objects.
+    Node 0 is root, nodes 1 .. columns are column headers.
+    The matrix is built only once for geometry, givens are covered before
+    search and uncovered after it, so the solver can be reused for any board.
+    """
+    def __init__(self, geometry: geometry_cls.Geometry):
+        self.geometry = geometry
+        size = geometry.size
+        columns = geometry.cells + len(geometry.units) * size
+        self._columns = columns
+        # Headers
+        self._L = [i - 1 for i in range(0, columns + 1)]
+        self._R = [i + 1 for i in range(0, columns + 1)]
+        self._L[0] = columns
+        self._R[columns] = 0
+        self._U = list(range(0, columns + 1))
+        self._D = list(range(0, columns + 1))
+        self._C = list(range(0, columns + 1))
+        self._S = [0] * (columns + 1)
+        self._N = [-1] * (columns + 1)  # Matrix row of node
+        self._row_first = []  # First node of every matrix row
+        # Matrix rows, row = index * size + value - 1
+        for index in range(0, geometry.cells):
+            for value in range(1, size + 1):
+                row = index * size + value - 1
+                row_columns = [index + 1]
+                for unit in geometry.cell_units[index]:
+                    row_columns.append(geometry.cells + unit * size + value)
+                self._row_first.append(self._add_row(row, row_columns))
+
+    def _add_row(self, row: int, row_columns: list) -> int:
+        L, R, U, D, C, S, N = self._L, self._R, self._U, self._D, self._C, self._S, self._N
+        first = len(L)
+        for pos, column in enumerate(row_columns):
+            node = first + pos
+            L.append(node - 1)
+            R.append(node + 1)
+            U.append(U[column])
+            D.append(column)
+            C.append(column)
+            N.append(row)
+            D[U[column]] = node
+            U[column] = node
+            S[column] += 1
+        last = first + len(row_columns) - 1
+        L[first] = last
+        R[last] = first
+        return first
+
+    def _cover(self, column: int):
+        L, R, U, D, C, S = self._L, self._R, self._U, self._D, self._C, self._S
+        L[R[column]] = L[column]
+        R[L[column]] = R[column]
+        i = D[column]
+        while i != column:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def _uncover(self, column: int):
+        L, R, U, D, C, S = self._L, self._R, self._U, self._D, self._C, self._S
+        i = U[column]
+        while i != column:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[column]] = column
+        R[L[column]] = column
+
+    def _select_row(self, node: int):
+        # Cover columns of row, starting with node's own column
+        R, C = self._R, self._C
+        self._cover(C[node])
+        j = R[node]
+        while j != node:
+            self._cover(C[j])
+            j = R[j]
+
+    def _unselect_row(self, node: int):
+        L, C = self._L, self._C
+        j = L[node]
+        while j != node:
+            self._uncover(C[j])
+            j = L[j]
+        self._uncover(C[node])
+
+    def _is_row_available(self, node: int) -> bool:
+        # Row is available if all of its nodes are still linked in columns
+        U, D, R = self._U, self._D, self._R
+        j = node
+        while True:
+            if D[U[j]] != j:
+                return False
+            j = R[j]
+            if j == node:
+                return True
+
+    def _cover_givens(self, values: list):
+        """Selects rows for all given values.
+        Returns list of selected nodes, or None if givens contradict each other.
+        """
+        size = self.geometry.size
+        selected = []
+        for index, value in enumerate(values):
+            if value:
+                node = self._row_first[index * size + value - 1]
+                if not self._is_row_available(node):
+                    self._uncover_givens(selected)
+                    return None
+                self._select_row(node)
+                selected.append(node)
+        return selected
+
+    def _uncover_givens(self, selected: list):
+        for node in reversed(selected):
+            self._unselect_row(node)
+
+    def solve(self, values: list, limit: int = 1) -> list:
+        """Returns list with up to 'limit' solutions of board.
+        values = flat list with cell values (0 = empty cell)
+        Every solution is flat list with values of all cells.
+        """
+        selected = self._cover_givens(values)
+        if selected is None:
+            return []
+        solutions = []
+        for path in self._search(limit):
+            solution = list(values)
+            size = self.geometry.size
+            for node in path:
+                row = self._N[node]
+                solution[row // size] = row % size + 1
+            solutions.append(solution)
+        self._uncover_givens(selected)
+        return solutions
+
+    def count(self, values: list, limit: int = 2) -> int:
+        """Returns number of solutions, counting stops at 'limit'."""
+        selected = self._cover_givens(values)
+        if selected is None:
+            return 0
+        result = 0
+        for path in self._search(limit):
+            result += 1
+        self._uncover_givens(selected)
+        return result
+
+    def _search(self, limit: int):
+        """Generator, yields path (list of selected nodes) for every solution found.
+        Search is iterative, all covered columns are uncovered when it ends.
+        """
+        L, R, D, S, C = self._L, self._R, self._D, self._S, self._C
+        cover = self._cover
+        uncover = self._uncover
+        path = []  # Selected node on every level
+        found = 0
+        descend = True
+        while True:
+            if descend:
+                if R[0] == 0:
+                    found += 1
+                    yield path
+                    if found >= limit:
+                        break
+                    descend = False
+                    continue
+                # Choose column with fewest rows
+                column = R[0]
+                best_size = S[column]
+                j = R[column]
+                while j != 0 and best_size > 1:
+                    if S[j] < best_size:
+                        column = j
+                        best_size = S[j]
+                    j = R[j]
+                if best_size == 0:
+                    descend = False
+                    continue
+                cover(column)
+                node = D[column]
+                path.append(node)
+                j = R[node]
+                while j != node:
+                    cover(C[j])
+                    j = R[j]
+            else:
+                if not path:
+                    break
+                node = path.pop()
+                column = C[node]
+                j = L[node]
+                while j != node:
+                    uncover(C[j])
+                    j = L[j]
+                node = D[node]
+                if node != column:
+                    path.append(node)
+                    j = R[node]
+                    while j != node:
+                        cover(C[j])
+                        j = R[j]
+                    descend = True
+                else:
+                    uncover(column)
+        # Search stopped early, uncover what is still covered
+        while path:
+            node = path.pop()
+            j = L[node]
+            while j != node:
+                uncover(C[j])
+                j = L[j]
+            uncover(C[node])
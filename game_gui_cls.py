@@ -3,6 +3,16 @@ import pygame
 import settings_cls
 import game_logic_cls
 import pygameButton
+import puzzle_editor_cls
+
+
+NEW_GAME_DEADLINE_MS = 300  # Longest wait for new puzzle, big boards get fewer empty cells
+
+def value_glyph(value: int) -> str:
+    """Returns text shown for value, 1-9 and then letters A-P for boards bigger than 9x9."""
+    if value < 10:
+        return str(value)
+    return chr(ord("A") + value - 10)
 
 
 class GameGUI():
@@ -13,15 +23,27 @@ class GameGUI():
         # self._stt = settings_cls.Setting()
         self._logic = game_logic_cls.SudokuGameLogic(settings_object)
         self._stt = settings_object
+        # Continue saved game, new game is started only if there is none
+        self._logic.enable_autosave()
+        self._logic.open_cache()
+        self._logic.enable_hint_worker()
+        self._logic.resume()
         self._win = screen_surface
         self._show_correct = False  # Shows user is entries correct
+        self._note_cache = {}  # Cell index -> (note mask and cell layout, surface with pencil marks)
+        self._note_font = (0, None)  # (font size, font) for pencil marks
         self._sudoku_solved = False  # Indicates is sudoku solved by user
         pygame.font.init()
         self._stt.board_font_size, self._font_width, self._font_height = self._find_font_size_for_board()
         # Define buttons
         self.btn_size9x9 = pygameButton.Button(self._win, (int(720 * self._stt.win_scale_x), int(30 * self._stt.win_scale_y)), int(70 * self._stt.win_scale_x), int(40 * self._stt.win_scale_y), "9x9", font_size=int(28 * self._stt.win_scale_x))
         self.btn_size6x6 = pygameButton.Button(self._win, (int(640 * self._stt.win_scale_x), int(30 * self._stt.win_scale_y)), int(70 * self._stt.win_scale_x), int(40 * self._stt.win_scale_y), "6x6", font_size=int(28 * self._stt.win_scale_x))
+        self.btn_size16x16 = pygameButton.Button(self._win, (int(640 * self._stt.win_scale_x), int(75 * self._stt.win_scale_y)), int(70 * self._stt.win_scale_x), int(40 * self._stt.win_scale_y), "16x16", font_size=int(24 * self._stt.win_scale_x))
+        self.btn_size25x25 = pygameButton.Button(self._win, (int(720 * self._stt.win_scale_x), int(75 * self._stt.win_scale_y)), int(70 * self._stt.win_scale_x), int(40 * self._stt.win_scale_y), "25x25", font_size=int(24 * self._stt.win_scale_x))
+        self.btn_variant = pygameButton.Button(self._win, (int(640 * self._stt.win_scale_x), int(120 * self._stt.win_scale_y)), int(70 * self._stt.win_scale_x), int(40 * self._stt.win_scale_y), self._stt.lang("variant_" + self._stt.game_variant), font_size=int(20 * self._stt.win_scale_x), bg_color="#3366CC")
         self.btn_new_game = pygameButton.Button(self._win, (int(10 * self._stt.win_scale_x), int(30 * self._stt.win_scale_y)), int(200 * self._stt.win_scale_x), int(50 * self._stt.win_scale_y), self._stt.lang("new_game"), font_size=int(46 * self._stt.win_scale_x), bg_color="green")
+        self.btn_editor = pygameButton.Button(self._win, (int(10 * self._stt.win_scale_x), int(90 * self._stt.win_scale_y)), int(200 * self._stt.win_scale_x), int(40 * self._stt.win_scale_y), self._stt.lang("enter_puzzle"), font_size=int(32 * self._stt.win_scale_x), bg_color="#3366CC")
+        self.btn_auto_notes = pygameButton.Button(self._win, (int(120 * self._stt.win_scale_x), int(755 * self._stt.win_scale_y)), int(170 * self._stt.win_scale_x), int(40 * self._stt.win_scale_y), self._stt.lang("auto_notes"), font_size=int(28 * self._stt.win_scale_x), bg_color="gray")
         self.btn_check_sudoku = pygameButton.Button(self._win, (int(300 * self._stt.win_scale_x), int(755 * self._stt.win_scale_y)), int(200 * self._stt.win_scale_x), int(40 * self._stt.win_scale_y), self._stt.lang("check_sudoku"), font_size=int(36 * self._stt.win_scale_x), bg_color="green")
         self.btn_help = pygameButton.Button(self._win, (int(505 * self._stt.win_scale_x), int(755 * self._stt.win_scale_y)), int(290 * self._stt.win_scale_x), int(40 * self._stt.win_scale_y), self._stt.lang("hint"), font_size=int(28 * self._stt.win_scale_x), bg_color="#FF0000", fg_color="#000066")
 
@@ -29,8 +51,8 @@ class GameGUI():
         # Find font size
         self._stt.board_font_size, self._font_width, self._font_height = self._find_font_size_for_board()
         # Create new game
-        if not self._logic.active_game:
-            self._logic.start_new_game()
+        if not self._logic.active_game and not self._logic.editor_mode:
+            self._logic.start_new_game(deadline_ms=NEW_GAME_DEADLINE_MS)
         # Show Table
         self.show_table(self._show_correct)
         # Show sudoku in table
@@ -50,11 +72,40 @@ class GameGUI():
             self.start_new_game()
             self.btn_size9x9.mouse_click = False
             self._sudoku_solved = False
-        if self.btn_check_sudoku.mouse_click:
+        if self.btn_size16x16.mouse_click:
+            self._stt.game_size = 16
+            self.start_new_game()
+            self.btn_size16x16.mouse_click = False
+            self._sudoku_solved = False
+        if self.btn_size25x25.mouse_click:
+            self._stt.game_size = 25
+            self.start_new_game()
+            self.btn_size25x25.mouse_click = False
+            self._sudoku_solved = False
+        if self.btn_variant.mouse_click:
+            # Next variant: classic -> x -> jigsaw -> classic
+            variants = settings_cls.VARIANTS
+            self._stt.game_variant = variants[(variants.index(self._stt.game_variant) + 1) % len(variants)]
+            self.start_new_game()
+            self.btn_variant.mouse_click = False
+            self._sudoku_solved = False
+        if self.btn_editor.mouse_click:
+            # Open editor, or play entered puzzle if it has one solution
+            if self._logic.editor_mode:
+                self._logic.finish_editor()
+            else:
+                self._logic.start_editor()
+            self.btn_editor.mouse_click = False
+            self._sudoku_solved = False
+        if self.btn_auto_notes.mouse_click:
+            self._logic.auto_notes = not self._logic.auto_notes
+            self.btn_auto_notes.mouse_click = False
+        # Puzzle in editor has no solution to check or hint from
+        if self.btn_check_sudoku.mouse_click and not self._logic.editor_mode:
             self._logic.analyze_user_input()
             self._show_correct = True
             self.btn_check_sudoku.mouse_click = False
-        if self.btn_help.mouse_click:
+        if self.btn_help.mouse_click and not self._logic.editor_mode:
             self._logic.analyze_user_input()
             self.show_hint()
             self._logic.analyze_user_input()
@@ -66,7 +117,11 @@ class GameGUI():
 
     def start_new_game(self):
         self._logic.active_game = False
-        self._logic.start_new_game()
+        self._logic.start_new_game(deadline_ms=NEW_GAME_DEADLINE_MS)
+
+    def close(self):
+        """Saves game and stops background workers."""
+        self._logic.close()
 
     def draw_gui(self):
         # Draw title image
@@ -126,9 +181,22 @@ class GameGUI():
         self.btn_new_game.caption = self._stt.lang("new_game")
         self.btn_size6x6.draw_button()
         self.btn_size9x9.draw_button()
-        self.btn_check_sudoku.draw_button()
+        self.btn_size16x16.draw_button()
+        self.btn_size25x25.draw_button()
+        self.btn_variant.draw_button()
+        self.btn_variant.caption = self._stt.lang("variant_" + self._stt.game_variant)
+        self.btn_editor.draw_button()
+        if self._logic.editor_mode:
+            self.btn_editor.caption = self._stt.lang("play_puzzle")
+        else:
+            self.btn_editor.caption = self._stt.lang("enter_puzzle")
+        self.btn_auto_notes.bg_color = "green" if self._logic.auto_notes else "gray"
+        self.btn_auto_notes.draw_button()
+        self.btn_auto_notes.caption = self._stt.lang("auto_notes")
+        if not self._logic.editor_mode:
+            self.btn_check_sudoku.draw_button()
         self.btn_check_sudoku.caption = self._stt.lang("check_sudoku")
-        if self._show_correct:
+        if self._show_correct and not self._logic.editor_mode:
             self.btn_help.draw_button()
         self.btn_help.caption = self._stt.lang("hint")
         # Level
@@ -160,6 +228,26 @@ class GameGUI():
         rect_level_down.x = int(720 * self._stt.win_scale_x)
         rect_level_down.y = int(530 * self._stt.win_scale_y)
         self._win.blit(img_level_down, rect_level_down)
+        # Status of puzzle in editor
+        if self._logic.editor_mode:
+            font = pygame.font.SysFont("Comic Sans MS", 28)
+            status = self._logic.editor_status
+            if status == puzzle_editor_cls.UNIQUE:
+                color = "light green"
+            elif status == puzzle_editor_cls.MULTIPLE:
+                color = "yellow"
+            else:
+                color = "red"
+            text = font.render(self._stt.lang("editor_" + status), 1, color)
+            self._win.blit(text, (int(280 * self._stt.win_scale_x), int(100 * self._stt.win_scale_y)))
+        # Can user entries still lead to solution
+        elif not self._sudoku_solved:
+            font = pygame.font.SysFont("Comic Sans MS", 28)
+            if self._logic.is_solvable():
+                text = font.render(self._stt.lang("solvable_msg"), 1, "light green")
+            else:
+                text = font.render(self._stt.lang("unsolvable_msg"), 1, "red")
+            self._win.blit(text, (int(280 * self._stt.win_scale_x), int(100 * self._stt.win_scale_y)))
         # If user is solved sudoku 
         if self._sudoku_solved:
             font = pygame.font.SysFont("Comic Sans MS", 40)
@@ -222,9 +310,15 @@ class GameGUI():
         self.btn_new_game.event_handler(event)
         self.btn_size6x6.event_handler(event)
         self.btn_size9x9.event_handler(event)
-        self.btn_check_sudoku.event_handler(event)
-        if self._show_correct:
-            self.btn_help.event_handler(event)
+        self.btn_size16x16.event_handler(event)
+        self.btn_size25x25.event_handler(event)
+        self.btn_variant.event_handler(event)
+        self.btn_editor.event_handler(event)
+        self.btn_auto_notes.event_handler(event)
+        if not self._logic.editor_mode:
+            self.btn_check_sudoku.event_handler(event)
+            if self._show_correct:
+                self.btn_help.event_handler(event)
                 
     def key_event_handler(self, keys):
         keys = pygame.key.get_pressed()
@@ -242,6 +336,23 @@ class GameGUI():
             self._stt.game_surface_zoom_level += 1
         elif keys[pygame.K_PAGEDOWN]:
             self._stt.game_surface_zoom_level -= 1
+        # Undo (Ctrl+Z) and redo (Ctrl+Y)
+        if pygame.key.get_mods() & pygame.KMOD_CTRL:
+            cell = None
+            if keys[pygame.K_z]:
+                cell = self._logic.undo()
+            elif keys[pygame.K_y]:
+                cell = self._logic.redo()
+            if cell:
+                self._stt.selection_x, self._stt.selection_y = cell
+                self._sudoku_solved = self._logic.check_sudoku_is_user_solved()
+            return
+        # Shift + value adds or removes pencil mark
+        if pygame.key.get_mods() & pygame.KMOD_SHIFT:
+            value = self._pressed_value(keys)
+            if value:
+                self._logic.toggle_note(self._stt.selection_x, self._stt.selection_y, value)
+            return
         # Number pressed
         if keys[pygame.K_0] or keys[pygame.K_DELETE] or keys[pygame.K_KP_0]:
             self._logic.set_cell_val(self._stt.selection_x, self._stt.selection_y, 0)
@@ -273,11 +384,28 @@ class GameGUI():
         elif keys[pygame.K_9] or keys[pygame.K_KP_9]:
             self._logic.set_cell_val(self._stt.selection_x, self._stt.selection_y, 9)
             self._sudoku_solved = self._logic.check_sudoku_is_user_solved()
+        else:
+            # Letters A-P for values 10-25
+            for value in range(10, self._stt.elements_in_game_x + 1):
+                if keys[pygame.K_a + value - 10]:
+                    self._logic.set_cell_val(self._stt.selection_x, self._stt.selection_y, value)
+                    self._sudoku_solved = self._logic.check_sudoku_is_user_solved()
+                    break
         # Spacebar pressed
         if keys[pygame.K_SPACE]:
             self._logic.analyze_user_input()
             self._show_correct = True
     
+    def _pressed_value(self, keys) -> int:
+        """Returns value of pressed key (1-9, then letters A-P), 0 if no value key is pressed."""
+        for value in range(1, 10):
+            if keys[pygame.K_0 + value] or keys[pygame.K_KP_1 + value - 1]:
+                return value
+        for value in range(10, self._stt.elements_in_game_x + 1):
+            if keys[pygame.K_a + value - 10]:
+                return value
+        return 0
+
     def show_hint(self):
         stt = self._stt
         wait_ms = stt.hint_animation_speed
@@ -375,20 +503,23 @@ class GameGUI():
         scale_y = stt.scale_delimiter_lines_y
         thickness = stt.delimiter_line_thicknes
         line_color = stt.delimiter_line_color
-        # Draw vertical lines
-        for x in range(0, stt.blocks_in_game_x + 1):
-            start_x = stt.board_surface_pos_x + (stt.element_width * stt.elements_in_block_x) * x + scale_x
-            start_y = stt.board_surface_pos_y + scale_y
-            end_x = start_x
-            end_y = start_y + stt.board_surface_height
-            pygame.draw.line(win, pygame.Color(line_color), (start_x, start_y), (end_x, end_y), thickness)
-        # Draw horizontal lines
-        for y in range(0, stt.blocks_in_game_y + 1):
-            start_x = stt.board_surface_pos_x + scale_x
-            start_y = stt.board_surface_pos_y + (stt.element_height * stt.elements_in_block_y) * y + scale_y
-            end_x = start_x + stt.board_surface_width
-            end_y = start_y
+        # Borders of blocks (or jigsaw regions) are compiled with geometry, in cells
+        geo = self._logic.geometry
+        for (x1, y1), (x2, y2) in geo.region_borders:
+            start_x = stt.board_surface_pos_x + stt.element_width * x1 + scale_x
+            start_y = stt.board_surface_pos_y + stt.element_height * y1 + scale_y
+            end_x = stt.board_surface_pos_x + stt.element_width * x2 + scale_x
+            end_y = stt.board_surface_pos_y + stt.element_height * y2 + scale_y
             pygame.draw.line(win, pygame.Color(line_color), (start_x, start_y), (end_x, end_y), thickness)
+        # Diagonals of Sudoku-X
+        if geo.diagonals:
+            left_x = stt.board_surface_pos_x + scale_x
+            top_y = stt.board_surface_pos_y + scale_y
+            right_x = left_x + stt.element_width * geo.elements_x
+            bottom_y = top_y + stt.element_height * geo.elements_y
+            diagonal_thickness = max(1, thickness // 2)
+            pygame.draw.line(win, pygame.Color(line_color), (left_x, top_y), (right_x, bottom_y), diagonal_thickness)
+            pygame.draw.line(win, pygame.Color(line_color), (right_x, top_y), (left_x, bottom_y), diagonal_thickness)
 
     def show_sudoku(self):
         win = self._win
@@ -399,14 +530,53 @@ class GameGUI():
         for x in range(0, stt.elements_in_game_x):
             for y in range(0, stt.elements_in_game_y):
                 value_set = table[y][x]
-                value = str(value_set[0])
+                value = value_glyph(value_set[0])
                 if value_set[1] or value_set[2]:
                     text = font.render(value, 1, self._stt.board_font_color)
                     element_pos_x = stt.board_surface_pos_x + stt.element_width * x
                     element_pos_y = stt.board_surface_pos_y + stt.element_height * y
-                    pos_x = element_pos_x + (stt.element_width - self._font_width) / 2
+                    # Letters are not as wide as digits
+                    pos_x = element_pos_x + (stt.element_width - text.get_width()) / 2
                     pos_y = element_pos_y + (stt.element_height - self._font_height) / 2
                     win.blit(text, (pos_x, pos_y))
+                else:
+                    mask = logic.note_mask(x, y)
+                    if mask:
+                        element_pos_x = stt.board_surface_pos_x + stt.element_width * x
+                        element_pos_y = stt.board_surface_pos_y + stt.element_height * y
+                        win.blit(self._note_surface(y * stt.elements_in_game_x + x, mask), (element_pos_x, element_pos_y))
+
+    def _note_surface(self, index: int, mask: int) -> pygame.Surface:
+        """Returns surface with pencil marks of cell, it is drawn again only when mask or cell size changes.
+        Marks are placed like values in block (value 1 top left).
+        """
+        stt = self._stt
+        key = (mask, stt.element_width, stt.element_height, stt.elements_in_block_x, stt.elements_in_block_y)
+        cached = self._note_cache.get(index)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        columns = stt.elements_in_block_x
+        rows = stt.elements_in_block_y
+        mark_width = stt.element_width / columns
+        mark_height = stt.element_height / rows
+        font_size = max(6, int(mark_height * 0.9))
+        if self._note_font[0] != font_size:
+            self._note_font = (font_size, pygame.font.SysFont(stt.board_font_name, font_size))
+        font = self._note_font[1]
+        surface = pygame.Surface((stt.element_width, stt.element_height), pygame.SRCALPHA)
+        value = 1
+        while mask:
+            if mask & 1:
+                text = font.render(value_glyph(value), 1, stt.board_font_color)
+                column = (value - 1) % columns
+                row = (value - 1) // columns
+                pos_x = column * mark_width + (mark_width - text.get_width()) / 2
+                pos_y = row * mark_height + (mark_height - text.get_height()) / 2
+                surface.blit(text, (pos_x, pos_y))
+            mask >>= 1
+            value += 1
+        self._note_cache[index] = (key, surface)
+        return surface
 
     def _find_font_size_for_board(self) -> int:
         max_height = int(self._stt.element_height * 2 / 3)
@@ -1,413 +1,742 @@
 import random
+import time
 import settings_cls
+import geometry_cls
+import candidates_cls
+import grid_generator_cls
+import solver_registry_cls
+import rating_cls
+import board_cls
+import batch_solver_cls
+import backtrack_solver_cls
+import move_journal_cls
+import save_game_cls
+import canonical_cls
+import analysis_cache_cls
+import hint_cls
+import puzzle_editor_cls
+import variant_cls
+
+
+CALIBRATION_BOARDS = 3  # Number of sample boards used to choose fastest solvers
+CALIBRATION_EMPTY = 40  # Percent of empty cells in calibration boards
+DIG_COUNT_NODES = 200  # Search nodes for proving that one removal keeps solution unique (9x9 board)
+HINT_BUDGET_MS = 5  # Time limit for hint search with techniques on 9x9 board
 
 
 class SudokuGameLogic():
     """Creates a sudoku table and determines the number of empty fields depending on
     the level of the game.
 
-    _board is list size X * Y
-    Board cell = [  value (int): Value of cell (1-4, 1-6 or 1-9)
-                    predefined (bool): If true, it is shown on board
-                    edited (bool): If true, user entered data in cell
-                    correct (bool): If true, user data is correct ]
-    _board_solved (list):
-        list with only numbers
+    _board (Board):
+        values (bytearray): Value of every cell (1-4, 1-6 or 1-9, 0 = empty)
+        flags (bytearray): For every cell bits
+                    PREDEFINED: If set, it is shown on board
+                    EDITED: If set, user entered data in cell
+                    CORRECT: If set, user data is correct
+        solution (bytearray): Solved board, contains just numbers
+    _cand (CandidateMasks):
+        occupancy bitmasks for all rows, columns and blocks, updated on
+        every cell change, used to find candidates for any cell
+    _solvers (SolverRegistry):
+        solver backends (exact cover, backtracking, propagation, parallel),
+        fastest backend for every operation is chosen on first game with
+        new board size
+    _rating (dict):
+        difficulty of current puzzle from PuzzleRater (grade, hardest technique,
+        steps per technique, solved)
+    _rng (random.Random):
+        random generator of current puzzle, seeded with puzzle_id
+    _journal (MoveJournal):
+        user moves for undo and redo
+    _cache (AnalysisCache):
+        solution, number of solutions and rating of puzzles seen before,
+        key is canonical hash, so equivalent puzzles share one entry
+    _saver (GameSaver):
+        if autosave is enabled, game is saved in background after every change
+    _hint_worker (HintWorker):
+        if enabled, hint for current board is computed in background after every change
+    _wrong_entries (int):
+        number of user entries that differ from solution, updated with every move
+    _editor (SolutionCounter):
+        in editor mode user enters givens of puzzle, counter keeps number of
+        solutions after every keystroke (None when not in editor mode)
+    _notes (list):
+        pencil marks, candidate mask of every cell (bit v-1 = value v);
+        in auto notes mode they start as candidates and follow every move
+        (only peers of changed cell are updated)
+    board_version (int):
+        grows with every change of board, background hints are valid only for their version
 
     """
-    def __init__(self, setting_object: settings_cls.Setting):
+    def __init__(self, setting_object: settings_cls.Setting, workers: int = None, cache_size: int = analysis_cache_cls.CACHE_SIZE):
+        """workers = number of processes for parallel solver (None = all cores, 1 = no parallel solver)
+        cache_size = number of puzzles in analysis cache
+        """
         self._stt = setting_object
         self.active_game = False  # Indicates that game is created
-        self._board = []  # Game board
-        self._solved_board = []  # Solved board, contains just numbers
+        self._board = None  # Game board
+        self._geo = None  # Compiled board geometry
+        self._cand = None  # Candidate engine
+        self._grids = None  # Solution grid generator
+        self._rater = None  # Difficulty rating engine
+        self._canonicalizer = None  # Canonical form of puzzles
+        self._rating = {}  # Rating of current puzzle
+        self._dirty_cells = set()  # Cells whose 'correct' flag may have changed
+        self._wrong_entries = 0
+        self._journal = move_journal_cls.MoveJournal()
+        self._saver = None
+        self._hint_worker = None
+        self._editor = None
+        self._notes = []
+        self._auto_notes = False
+        self.board_version = 0
+        self.puzzle_id = None  # Seed of current puzzle, None for resumed game
+        self._rng = random.Random()
+        self._solvers = solver_registry_cls.SolverRegistry(workers)
+        self._cache = analysis_cache_cls.AnalysisCache(cache_size)
+        self._cache_path = None
 
-    def start_new_game(self):
+    def start_new_game(self, minimal: bool = False, puzzle_id: int = None, deadline_ms: float = None) -> dict:
         """Starts new game.
             - Creates empty table
             - Populates table with predefinded values
+            - Removes values while puzzle still has unique solution
+        If 'minimal' is True, tries to remove every value (see _empty_user_cells).
+        puzzle_id = 64 bit seed of puzzle (None = random). Same puzzle_id,
+            board size, variant, level and 'minimal' always give the same puzzle.
+        deadline_ms = time limit, when it is reached digging stops and puzzle
+            dug so far is used (every removal keeps solution unique, so it is
+            always valid and it is the closest to level found so far).
+            Puzzle is then rated on first use of 'rating'. Game level is
+            never changed.
+        Returns report (dict):
+            empty (int): number of empty cells
+            target (int): number of empty cells required by level
+            closeness (float): empty / target (1.0 = level reached)
+            timed_out (bool): True if deadline stopped digging
+            elapsed_ms (float): time of generation
         """
+        start = time.perf_counter()
+        deadline = None if deadline_ms is None else start + deadline_ms / 1000
+        if puzzle_id is None:
+            puzzle_id = random.getrandbits(64)
+        self.puzzle_id = puzzle_id
+        self._rng = random.Random(puzzle_id)
         self.active_game = True
-        is_solved = False
-        count_try = 0
-        while not is_solved:
-            self._create_empty_board()
-            self._create_new_sudoku()
-            self._empty_user_cells()
-            is_solved = self._solve_sudoku()
-            count_try += 1
-            if count_try % 50 == 0:
-                self._stt.game_level -= 1
-
-    def _restore_table_to_created(self):
-        """Restores self._board to self.solved_board
-        When 'solve sudoku' did not find a solution, then we make empty cells
-        again with a different layout. This function resets user cells and
-        returns everything to default solved cell.
+        self._create_empty_board(new_layout=True)
+        self._create_new_sudoku()
+        target = self._target_empty_cells(minimal)
+        empty, timed_out = self._empty_user_cells(target, deadline)
+        if deadline is None:
+            self._rating = self._analyze(self._cand.values, self._board.solution)[1]["rating"]
+        else:
+            self._rating = {}  # Rated on first use
+        self._fill_auto_notes()
+        self._board_changed()
+        return {
+            "empty": empty,
+            "target": target,
+            "closeness": empty / target if target else 1.0,
+            "timed_out": timed_out,
+            "elapsed_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    def start_puzzle(self, values: list) -> int:
+        """Starts game with given puzzle (flat list, 0 = empty cell) for board size from settings.
+        Game is started only if puzzle has exactly one solution, otherwise
+        board is left empty and no game is active.
+        Returns number of solutions (counting stops at 2), 0 if value is repeated in some unit.
         """
-        count = 0
-        for y in range(0, self._stt.elements_in_game_y):
-            for x in range(0, self._stt.elements_in_game_x):
-                self._board[y][x] = [self._solved_board[count], True, False, False]
+        # Geometry is made once, new jigsaw regions use values from self._rng
+        geo, grid = self._variant_geometry()
+        if len(values) != geo.cells or any(not 0 <= value <= geo.size for value in values):
+            return 0
+        self._create_empty_board(geometry=geo, grid=grid)
+        # Puzzle with conflicts has no solution and no valid canonical form, so it is not analyzed
+        self._cand.load(values)
+        has_conflicts = self._cand.has_conflicts()
+        self._cand.reset()
+        if has_conflicts:
+            self.active_game = False
+            return 0
+        solution, entry = self._analyze(values)
+        if entry["count"] == 1:
+            for index, value in enumerate(values):
+                self._set_cell_val(*geo.position(index), value, predefinded=bool(value))
+            self._board.solution[:] = bytes(solution)
+            self._rating = entry["rating"]
+            self.puzzle_id = None
+            self.active_game = True
+            self._fill_auto_notes()
+            self._board_changed()
+        else:
+            self.active_game = False
+        return entry["count"]
+
+    def _analyze(self, puzzle: list, solution: list = None) -> tuple:
+        """Returns (solution, cache entry) of puzzle.
+        Puzzle seen before (also relabeled, swapped or transposed) is not solved again.
+        'solution' can be given if it is already known and puzzle is unique.
+        Puzzle must not have conflicts (value repeated in unit).
+        """
+        canonicalizer = self._canonicalizer
+        form, transformation = canonicalizer.transform(list(puzzle))
+        key = canonicalizer.form_hash(form)
+        entry = self._cache.get(key)
+        if entry is None:
+            if solution is not None:
+                count = 1
+            else:
+                if not self._solvers.is_calibrated(self._geo):
+                    self._calibrate_solvers()
+                count = self._solvers.count(self._geo, list(puzzle), 2)
+                solution = self._solvers.solve(self._geo, list(puzzle)) if count else None
+            entry = {
+                "solution": canonicalizer.apply(transformation, list(solution)) if solution is not None else None,
+                "count": count,
+                # Canonical puzzle is rated, so all equivalent puzzles get the same rating
+                "rating": self._rater.rate(list(form)),
+            }
+            self._cache.put(key, entry)
+        elif entry["solution"] is not None:
+            solution = canonicalizer.revert(transformation, entry["solution"])
+        return (solution, entry)
+
+    def open_cache(self, path: str = analysis_cache_cls.CACHE_FILE) -> bool:
+        """Loads analysis cache from 'path', cache is written there on close()."""
+        self._cache_path = path
+        return self._cache.load(path)
+
+    @property
+    def cache_stats(self) -> dict:
+        return {"hits": self._cache.hits, "misses": self._cache.misses, "entries": len(self._cache)}
+
+    def enable_autosave(self, path: str = save_game_cls.SAVE_FILE):
+        """Saves game to 'path' after every change (in background thread)."""
+        self._saver = save_game_cls.GameSaver(path)
+
+    def enable_hint_worker(self):
+        """Computes hint in background thread after every change, so user_hint() is instant."""
+        self._hint_worker = hint_cls.HintWorker()
+        self._schedule_hint()
+
+    def _board_changed(self):
+        """Saves game and starts background hint after user move or new game."""
+        self._autosave()
+        self._schedule_hint()
 
-    def user_hint(self) -> tuple:
+    def _schedule_hint(self):
+        if self._hint_worker is not None and self.active_game:
+            board = self._board
+            self._hint_worker.submit(self.board_version, self._geo, bytes(board.values), bytes(board.solution))
+
+    def _autosave(self):
+        if self._saver is not None and self.active_game:
+            self._saver.save(self.save_state())
+
+    def save_state(self) -> bytes:
+        """Returns game (board, solution and move journal) in binary format of save_game_cls."""
+        board = self._board
+        return save_game_cls.encode_game(self._geo.key, board.values, board.flags, board.solution, self._journal.to_bytes(), self._journal.position)
+
+    def load_state(self, data: bytes) -> bool:
+        """Continues game saved with save_state().
+        Board size and variant in settings are changed to those of saved game.
+        Returns False if data is not a valid saved game, then settings and
+        current game are not changed.
+        """
+        try:
+            key, values, flags, solution, journal, position = save_game_cls.decode_game(data)
+        except ValueError:
+            return False
+        geo = geometry_cls.get_geometry_by_key(key)
+        # Solution is seed grid of jigsaw regions, so it has to be solved grid
+        all_values = list(range(1, geo.size + 1))
+        if any(sorted(solution[index] for index in unit) != all_values for unit in geo.units):
+            return False
+        stt = self._stt
+        stt.game_size = geo.elements_x
+        stt.game_variant = variant_cls.variant_of(geo)
+        self._create_empty_board(geometry=geo, grid=list(solution))
+        board = self._board
+        board.values[:] = values
+        board.flags[:] = flags
+        board.solution[:] = solution
+        # Moves are checked by decode_game()
+        self._journal.load_bytes(journal, position)
+        self._cand.load(board.values)
+        self._wrong_entries = sum(1 for value, correct in zip(board.values, board.solution) if value and value != correct)
+        self._dirty_cells.update(range(0, self._geo.cells))
+        self._rating = {}  # Rated on first use
+        self.puzzle_id = None
+        self.active_game = True
+        self.board_version += 1
+        self._fill_auto_notes()
+        self._schedule_hint()
+        return True
+
+    def resume(self, path: str = save_game_cls.SAVE_FILE) -> bool:
+        """Continues game saved in 'path', returns False if there is no valid saved game."""
+        data = save_game_cls.read_game(path)
+        if data is None:
+            return False
+        return self.load_state(data)
+
+    def _calibrate_solvers(self):
+        """Measures solver backends on sample boards with CALIBRATION_EMPTY percent of cells empty.
+        Random boards with more empty cells have many solutions and on 25x25
+        board they take seconds to solve, while real puzzles don't.
+        """
+        boards = []
+        for i in range(0, CALIBRATION_BOARDS):
+            board = self._grids.new_grid()
+            pos = list(range(0, self._geo.cells))
+            random.shuffle(pos)
+            for index in pos[:self._geo.cells * CALIBRATION_EMPTY // 100]:
+                board[index] = 0
+            boards.append(board)
+        self._solvers.calibrate(self._geo, boards)
+
+    def user_hint(self, budget_ms: float = None) -> tuple:
         """This function return cell that has to be changed.
-        Returns (hint_x, hint_y, hint_val) (tuple)
+        Returns (hint_x, hint_y, hint_val, technique, cells) (tuple)
             hint_x, hint_y = cell position
-            hint_val = value to write in cell
+            hint_val = value to write in cell (0 = wrong value has to be deleted)
+            technique = name of hardest technique needed for this value (from
+                rating_cls.TECHNIQUES), "wrong_value" or "solution"
+            cells = ((x, y), ...) cells that make the pattern of technique
+        Techniques from easiest to hardest are applied until some value is
+        written. If that takes more than 'budget_ms' (default HINT_BUDGET_MS
+        scaled to board size) or no technique can be used, value is taken
+        from solution for empty cell with fewest candidates.
+        If hint worker is enabled and hint for current board is ready, it is
+        returned at once.
+        Returns None in editor mode, edited puzzle has no solution yet.
         """
-        stt = self._stt
-        # Get table with solution
-        table = self._solved_board
-        # Define hint_x,hint_y position where to go and changed value - hint_val
-        hint_x = 0
-        hint_y = 0
-        hint_val = 0
-        # Check all bad entries from user and return one that needs to be changed
-        count = 0
-        for y in range(0, stt.elements_in_game_y):
-            for x in range(0, stt.elements_in_game_x):
-                cell_val = self._get_cell_val(x, y)
-                if cell_val != table[count] and cell_val != 0:
-                    return (x, y, 0)
-                count += 1
-        # Search for value hint and return it
-        # First search for simple case where you look only one cell
-        has_improved = False
-        for y in range(0, stt.elements_in_game_y):
-            if has_improved:
-                break
-            for x in range(0, stt.elements_in_game_x):
-                if has_improved:
-                    break
-                if self._board[y][x][1] is True or self._board[y][x][0] != 0:
-                    continue
-                # Check is there cell with only 1 solution
-                solutions = self._available_vals(x,y)
-                if len(solutions) == 1:
-                    hint_x = x
-                    hint_y = y
-                    hint_val = solutions[0]
-                    has_improved = True
-        # If we found cell then return it, else perform more complex search
-        if has_improved:
-            return (hint_x, hint_y, hint_val)
-        # Now preform complex search
-        # Check row
-        for y in range(0, stt.elements_in_game_y):
-            if has_improved:
-                break
-            for x in range(0, stt.elements_in_game_x):
-                if has_improved:
-                    break
-                if self._board[y][x][1] is True or self._board[y][x][0] != 0:
-                    continue
-                values = []
-                solutions = self._available_vals(x,y)
-                for x1 in range(0, stt.elements_in_game_x):
-                    if x != x1:
-                        if self._get_cell_val(x1, y) == 0:
-                            values = values + self._available_vals(x1, y)
-                for solution in solutions:
-                    if solution not in values:
-                        hint_x = x
-                        hint_y = y
-                        hint_val = solution
-                        has_improved = True
-        # If we found cell then return it, else search more
-        if has_improved:
-            return (hint_x, hint_y, hint_val)
-        # Search columns
-        for y in range(0, stt.elements_in_game_y):
-            if has_improved:
-                break
-            for x in range(0, stt.elements_in_game_x):
-                if has_improved:
-                    break
-                if self._board[y][x][1] is True or self._board[y][x][0] != 0:
-                    continue
-                values = []
-                solutions = self._available_vals(x,y)
-                for y1 in range(0, stt.elements_in_game_y):
-                    if y != y1:
-                        if self._get_cell_val(x, y1) == 0:
-                            values = values + self._available_vals(x, y1)
-                for solution in solutions:
-                    if solution not in values:
-                        hint_x = x
-                        hint_y = y
-                        hint_val = solution
-                        has_improved = True
-        # If we found cell then return it, else search more
-        if has_improved:
-            return (hint_x, hint_y, hint_val)
-        # Search block
-        for y in range(0, stt.elements_in_game_y):
-            if has_improved:
-                break
-            for x in range(0, stt.elements_in_game_x):
-                if has_improved:
-                    break
-                if self._board[y][x][1] is True or self._board[y][x][0] != 0:
-                    continue
-                solutions = self._available_vals(x,y)
-                values = self._find_all_block_values_for_solve_sudoku(x, y)
-                for solution in solutions:
-                    if solution not in values:
-                        hint_x = x
-                        hint_y = y
-                        hint_val = solution
-                        has_improved = True
-        # This was the last step and the solution should be found.
-        if has_improved:
-            return (hint_x, hint_y, hint_val)
-        # In case the solution is not found, this code has a bug, so return None
-        # da_li_je_resiv = self._solve_sudoku(leave = True)
-        return None
-    
+        if self._editor is not None:
+            return None
+        if self._hint_worker is not None:
+            ready, hint = self._hint_worker.result(self.board_version)
+            if ready:
+                return hint
+        geo = self._geo
+        if budget_ms is None:
+            budget_ms = HINT_BUDGET_MS * geo.cells / 81
+        return hint_cls.find_hint(geo, self._rater, self._cand, self._board.solution, budget_ms)
+
     def analyze_user_input(self):
-        for y in range(0, self._stt.elements_in_game_y):
-            for x in range(0, self._stt.elements_in_game_x):
-                cell = self._board[y][x]
-                if not cell[1]:
-                    allowed = self._available_vals(x, y)
-                    if cell[0] not in allowed:
-                        self._board[y][x][3] = False
-                    else:
-                        self._board[y][x][3] = True
+        """Updates 'correct' flag of user cells.
+        Only cells changed since last call (and peers with same values) are checked.
+        """
+        cand = self._cand
+        values = self._board.values
+        flags = self._board.flags
+        for index in self._dirty_cells:
+            if not flags[index] & board_cls.PREDEFINED:
+                value = values[index]
+                if value and cand.candidates(index) & (1 << (value - 1)):
+                    flags[index] |= board_cls.CORRECT
+                else:
+                    flags[index] &= ~board_cls.CORRECT
+        self._dirty_cells.clear()
+
+    def is_solvable(self) -> bool:
+        """Returns True if user entries still lead to solution.
+        Every puzzle has exactly one solution, so board can be completed only
+        if every entry is equal to solution. Wrong entries are counted with
+        every move, so check does not search and takes no time.
+        """
+        return self.active_game and not self._wrong_entries
 
     def check_sudoku_is_user_solved(self) -> bool:
-        solved = True
-        for y in range(0, self._stt.elements_in_game_y):
-            if not solved:
-                break
-            for x in range(0, self._stt.elements_in_game_x):
-                cell = self._board[y][x]
-                if cell[0] == 0:
-                    solved = False
-                    break
-                allowed = self._available_vals(x, y)
-                if len(allowed) == 1:
-                    if allowed[0] != cell[0]:
-                        solved = False
-                        break
-                else:
-                    solved = False
-                    break
-        return solved
+        return self._editor is None and self._cand.is_valid()
 
-    def _create_empty_board(self):
+    def _create_empty_board(self, new_layout: bool = False, geometry: geometry_cls.Geometry = None, grid: list = None):
+        """Creates empty board for geometry from settings.
+        new_layout = jigsaw board gets new random regions (otherwise current regions are kept)
+        geometry, grid = geometry of board and its solved grid (e.g. of saved game),
+            grid is used as seed grid only for jigsaw regions
+        """
         elements_x = self._stt.elements_in_game_x
         elements_y = self._stt.elements_in_game_y
-        self._board = []
-        self._solved_board = []
-        for y in range(0, elements_y):
-            x_list = []
-            for x in range(0, elements_x):
-                x_list.append([0, False, False, False])
-            self._board.append(x_list)
+        if geometry is None:
+            geometry, grid = self._variant_geometry(new_layout)
+        geo = geometry
+        if self._geo is not geo:
+            if self._geo is not None and self._geo.regions is not None:
+                # Old jigsaw layout is not used again
+                self._solvers.forget(self._geo)
+            self._geo = geo
+            self._cand = candidates_cls.CandidateMasks(geo)
+            # Only grid of jigsaw regions is known to be solvable, it is relabeled for new games,
+            # other geometries keep built-in seed grids (classic) or search (Sudoku-X)
+            seeds = [grid] if grid is not None and geo.regions is not None else None
+            self._grids = grid_generator_cls.GridGenerator(geo, seeds)
+            self._rater = rating_cls.PuzzleRater(geo)
+            self._canonicalizer = canonical_cls.Canonicalizer(geo)
+        else:
+            self._cand.reset()
+        self._board = board_cls.Board(elements_x, elements_y)
+        self._editor = None
+        self._notes = [0] * self._geo.cells
+        self.board_version += 1
+        self._wrong_entries = 0
+        self._dirty_cells.clear()
+        self._journal.clear()
+
+    def _setting_geometry(self) -> geometry_cls.Geometry:
+        """Returns geometry for board size and variant from settings without
+        making new jigsaw regions (None for jigsaw if current board has no regions).
+        """
+        if self._stt.game_variant == variant_cls.JIGSAW and not self._has_layout():
+            return None
+        return self._variant_geometry()[0]
+
+    def _has_layout(self) -> bool:
+        """True if current board has jigsaw regions for board size from settings."""
+        stt = self._stt
+        geo = self._geo
+        return (geo is not None and geo.regions is not None
+                and (geo.elements_x, geo.elements_y) == (stt.elements_in_game_x, stt.elements_in_game_y))
+
+    def _variant_geometry(self, new_layout: bool = False) -> tuple:
+        """Returns (geometry, solved grid) for board size and variant from settings.
+        Jigsaw regions of current board are kept unless 'new_layout' is True,
+        then new regions are made with self._rng (grid is None if regions are kept
+        and for other variants).
+        """
+        stt = self._stt
+        variant = stt.game_variant
+        if variant == variant_cls.JIGSAW and not new_layout and self._has_layout():
+            return (self._geo, None)
+        return variant_cls.get_variant_geometry(variant, stt.elements_in_game_x, stt.elements_in_game_y,
+                                                stt.elements_in_block_x, stt.elements_in_block_y, self._rng)
+
+    @property
+    def geometry(self) -> geometry_cls.Geometry:
+        """Compiled geometry of current board (units, regions and their borders)."""
+        return self._geo
+
+    def batch_solver(self, geometry: geometry_cls.Geometry = None) -> batch_solver_cls.BatchSolver:
+        """Returns NumPy batch solver for board size and variant from settings.
+        Boards it can't solve with propagation are solved with fastest scalar solver.
+        geometry = geometry of boards, jigsaw boards use regions of current
+            board if it is not given (ValueError if there are none)
+        """
+        geo = geometry or self._setting_geometry()
+        if geo is None:
+            raise ValueError("Jigsaw regions are not known")
+        return batch_solver_cls.BatchSolver(geo, self._solvers.best(geo, "solve"))
 
     def _get_cell_val(self, x: int, y: int) -> int:
-        return self._board[y][x][0]
+        return self._board.values[self._geo.index(x, y)]
     
     def _set_cell_val(self, x: int, y: int, value: int, predefinded: bool = False, edited: bool = False, correct: bool = False):
-        self._board[y][x] = [value, predefinded, edited, correct]
+        index = self._geo.index(x, y)
+        self._board.set(index, value, board_cls.make_flags(predefinded, edited, correct))
+        self._cand.set_val(index, value)
+        self.board_version += 1
 
     def set_cell_val(self, x: int, y: int, value: int):
-        cell = self._board[y][x]
+        index = self._geo.index(x, y)
+        flags = self._board.flags[index]
+        if self._editor is not None:
+            self._set_given(index, value)
+            return
         if value == 0:
-            edited = False
+            edited = 0
         else:
-            edited = True
-        if not cell[1]:
-            self._board[y][x] = [value, False, edited, cell[3]]
-
-    def _available_vals(self, x: int, y: int) -> list:
-        # Save old value and put 0 in cell
-        old_val = self._board[y][x][0]
-        self._board[y][x][0] = 0
-        # Find x occupied values
-        vals_x = [v[0] for v in self._board[y] if v[0] != 0]
-        # Find y occupied values
-        vals_y = [v[x][0] for v in self._board if v[x][0] != 0]
-        # Find block occupied values
-        vals_b = []
-        start_pos_x = int(x / self._stt.elements_in_block_x) * self._stt.elements_in_block_x
-        start_pos_y = int(y / self._stt.elements_in_block_y) * self._stt.elements_in_block_y
-        for pos_y in range(start_pos_y, start_pos_y + self._stt.elements_in_block_y):
-            for pos_x in range(start_pos_x, start_pos_x + self._stt.elements_in_block_x):
-                if self._board[pos_y][pos_x][0] != 0:
-                    vals_b.append(self._board[pos_y][pos_x][0])
-        # Make all_v list with all allowed values
-        all_v = []
-        for i in range(1, self._stt.block_size + 1):
-            all_v.append(i)
-        # Remove all existing values ​​from the list
-        all_v = [v for v in all_v if v not in vals_x]
-        all_v = [v for v in all_v if v not in vals_y]
-        all_v = [v for v in all_v if v not in vals_b]
-        # Return the old value to the cell
-        self._board[y][x][0] = old_val
-        # Return a list of available values
-        return all_v
+            edited = board_cls.EDITED
+        if value > self._geo.size:
+            return
+        if not flags & board_cls.PREDEFINED:
+            old_val = self._board.values[index]
+            if old_val == value:
+                return
+            new_flags = edited | flags & board_cls.CORRECT
+            self._journal.record(index, old_val, value, flags, new_flags)
+            self._apply_move(index, value, new_flags)
+            self._board_changed()
+
+    def _apply_move(self, index: int, value: int, flags: int):
+        old_val = self._board.values[index]
+        self._board.set(index, value, flags)
+        self._cand.set_val(index, value)
+        self.board_version += 1
+        if self._editor is not None:
+            # Givens of edited puzzle, there is no solution to compare with
+            self._editor.set_val(index, value)
+            return
+        correct = self._board.solution[index]
+        self._wrong_entries += bool(value and value != correct) - bool(old_val and old_val != correct)
+        self._update_notes(index, old_val, value)
+        # Cell and peers with old or new value may change 'correct' flag
+        self._dirty_cells.add(index)
+        values = self._cand.values
+        for peer in self._geo.peers[index]:
+            if values[peer] and (values[peer] == old_val or values[peer] == value):
+                self._dirty_cells.add(peer)
+
+    def start_editor(self):
+        """Starts editor mode with empty board of size from settings.
+        Values entered with set_cell_val() are givens of new puzzle, after
+        every change editor_status tells if puzzle can be played.
+        """
+        self._create_empty_board()
+        self.active_game = False
+        self.puzzle_id = None
+        self._rating = {}
+        self._editor = puzzle_editor_cls.SolutionCounter(self._geo)
+
+    @property
+    def editor_mode(self) -> bool:
+        return self._editor is not None
+
+    @property
+    def editor_status(self) -> str:
+        """Status of edited puzzle (puzzle_editor_cls CONTRADICTION, NO_SOLUTION, UNIQUE or MULTIPLE),
+        None if not in editor mode.
+        """
+        if self._editor is None:
+            return None
+        return self._editor.status
+
+    def finish_editor(self) -> bool:
+        """Starts game with edited puzzle if it has exactly one solution.
+        Returns False (editor stays open) if puzzle can't be played.
+        """
+        if self._editor is None or self._editor.status != puzzle_editor_cls.UNIQUE:
+            return False
+        return self.start_puzzle(list(self._board.values)) == 1
+
+    def _set_given(self, index: int, value: int):
+        if value > self._geo.size:
+            return
+        old_val = self._board.values[index]
+        if old_val == value:
+            return
+        flags = self._board.flags[index]
+        new_flags = board_cls.PREDEFINED if value else 0
+        self._journal.record(index, old_val, value, flags, new_flags)
+        self._apply_move(index, value, new_flags)
+
+    @property
+    def auto_notes(self) -> bool:
+        return self._auto_notes
+
+    @auto_notes.setter
+    def auto_notes(self, value: bool):
+        """Turning auto notes on fills notes of empty cells with candidates, turning them off clears all notes."""
+        self._auto_notes = bool(value)
+        if self._auto_notes:
+            self._fill_auto_notes()
+        elif self._notes:
+            self._notes = [0] * self._geo.cells
+
+    def note_mask(self, x: int, y: int) -> int:
+        """Returns pencil marks of cell (bit v-1 = value v)."""
+        return self._notes[self._geo.index(x, y)]
+
+    def toggle_note(self, x: int, y: int, value: int):
+        """Adds or removes pencil mark 'value' in empty cell."""
+        index = self._geo.index(x, y)
+        if not 1 <= value <= self._geo.size or self._board.values[index] or self._editor is not None:
+            return
+        self._notes[index] ^= 1 << (value - 1)
+
+    def _fill_auto_notes(self):
+        # The only full computation, later moves update notes of peers
+        if not self._auto_notes or self._board is None:
+            return
+        cand = self._cand
+        self._notes = [0 if value else cand.candidates(index) for index, value in enumerate(cand.values)]
+
+    def _update_notes(self, index: int, old_val: int, value: int):
+        """Updates notes after cell changed from 'old_val' to 'value'.
+        Written value is removed from notes of peers. In auto notes mode
+        removed value is added again to peers that can have it, and empty
+        cell gets its candidates.
+        """
+        notes = self._notes
+        peers = self._geo.peers[index]
+        if value:
+            notes[index] = 0
+            mask = ~(1 << (value - 1))
+            for peer in peers:
+                notes[peer] &= mask
+        elif self._auto_notes:
+            notes[index] = self._cand.candidates(index)
+        if old_val and self._auto_notes:
+            cand = self._cand
+            values = cand.values
+            bit = 1 << (old_val - 1)
+            for peer in peers:
+                if not values[peer] and cand.candidates(peer) & bit:
+                    notes[peer] |= bit
+
+    def undo(self) -> tuple:
+        """Reverts last user move.
+        Returns (x, y) of changed cell, or None if there is nothing to undo.
+        """
+        move = self._journal.undo()
+        if move is None:
+            return None
+        self._apply_move(*move)
+        self._board_changed()
+        return self._geo.position(move[0])
+
+    def redo(self) -> tuple:
+        """Applies again last undone move.
+        Returns (x, y) of changed cell, or None if there is nothing to redo.
+        """
+        move = self._journal.redo()
+        if move is None:
+            return None
+        self._apply_move(*move)
+        self._board_changed()
+        return self._geo.position(move[0])
 
     def _create_new_sudoku(self):
         stt = self._stt
         # Build Sudoku
         """ Rules for creating Sudoku:
-        Create a blank 9x9 board.
-        Fill the first row randomly with numbers from 1 to 9.
-        Fill the second row so that the numbers in it are not repeated in the 
-            same column or the same 3x3 region as the numbers in the first row.
-        Continue filling in the remaining rows in the same way,
-            using Sudoku rules to ensure that no number is repeated in 
-            the same row, column or 3x3 region.
+        Take one of valid seed grids for this board size.
+        Relabel numbers, swap rows inside band and bands, swap columns
+            inside stack and stacks, and transpose if blocks are square.
+        Each of these changes keeps the grid valid, so there are no dead ends.
+        Variants keep only relabeling: Sudoku-X grid is built from random
+        linear map (or found by search if blocks are not square) and jigsaw
+        grid is the grid its regions were made from.
         """
+        grid = self._grids.new_grid(self._rng)
         count = 0
-        start_over = False
-        sudoku_found = False
-        for i in range(99):
-            if sudoku_found:
-                if self._is_sudoku_valid():
-                    break
-                else:
-                    sudoku_found = False
-            while count < 40:
-                for y in range(0, stt.elements_in_game_y):
-                    if start_over:
-                        break
-                    for x in range(0, stt.elements_in_game_x):
-                        if start_over:
-                            break
-                        allowed_list = self._available_vals(x, y)
-                        if allowed_list:
-                            index = random.randint(0, len(allowed_list) - 1)
-                            self._set_cell_val(x, y, allowed_list[index], predefinded=True)
-                        else:
-                            start_over = True
-                if start_over:
-                    start_over = False
-                else:
-                    sudoku_found = True
-                    break
-                count += 1
-        # Copy board to self._solved_board
-        self._solved_board = []
         for y in range(0, stt.elements_in_game_y):
             for x in range(0, stt.elements_in_game_x):
-                self._solved_board.append(self._board[y][x][0])
+                self._set_cell_val(x, y, grid[count], predefinded=True)
+                count += 1
+        # Copy board to solution
+        self._board.solution[:] = bytes(grid)
        
-    def _empty_user_cells(self):
+    def _target_empty_cells(self, minimal: bool = False) -> int:
+        """Returns number of empty cells required by game level (all cells if 'minimal')."""
+        stt = self._stt
+        count = stt.elements_in_game_x * stt.elements_in_game_y
+        if not minimal:
+            count = int(count * stt.game_level * stt.level_points / 100)
+        return count
+
+    def _empty_user_cells(self, user_cells_count: int, deadline: float = None) -> tuple:
+        """Digs values from solved board one at a time.
+        Removal is kept only if puzzle still has unique solution.
+        Every cell is tried only once, if a removal is rejected it would be
+        rejected later too.
+        If singles propagation finds removed value again, solution is still
+        unique and solutions are not counted (most removals on large boards).
+        Removal is also rejected if uniqueness is not proven in DIG_COUNT_NODES
+        search nodes, on 16x16 and 25x25 boards some last removals could take
+        minutes. Node on bigger board is slower, so limit is divided by square
+        of number of cells (relative to 9x9), 20 nodes on 16x16 and 3 on 25x25.
+        Such removal may be possible, so after trying all cells puzzle is
+        minimal only if node limit never rejected a removal. This holds for
+        classic boards up to 9x9 and for variants up to 6x6. On 9x9 Sudoku-X
+        and jigsaw boards about a third of minimal puzzles had a count that hit
+        the limit, and most counts on 16x16 and 25x25 boards hit it.
+        deadline = time.perf_counter() value, digging stops when it is reached
+            (puzzle after every kept removal is unique, so it can stop anytime).
+        Returns (number of empty cells, True if deadline stopped digging).
+        """
         stt = self._stt        
-        # Counts number of added predefined cells
+        # Counts number of empty cells
         count = 0
-        # Maximum of predefined cells
-        user_cells_count  = stt.elements_in_game_x * stt.elements_in_game_y
-        user_cells_count = int(user_cells_count * stt.game_level * stt.level_points / 100)
         pos = []
         for x in range(0, stt.elements_in_game_x):
             for y in range(0, stt.elements_in_game_y):
                 pos.append((x, y))
-        random.shuffle(pos)
-        for i in range(0, user_cells_count):
-            self._set_cell_val(pos[i][0], pos[i][1], 0, False, False, False)
-
-    def _solve_sudoku(self) -> bool:
-        stt = self._stt
-        # Backup original table
-        table = []
-        for y in range(0, stt.elements_in_game_y):
-            for x in range(0, stt.elements_in_game_x):
-                table.append(self._board[y][x][0])
-        # Track if sudoku is solved
-        is_solved = False
-        # Track is there improve, if not exit while loop and return false
-        has_improved = True
-        while has_improved:
-            has_improved = False
-            # Walk through all cells
-            for y in range(0, stt.elements_in_game_y):
-                for x in range(0, stt.elements_in_game_x):
-                    if self._board[y][x][1] is True or self._board[y][x][0] != 0:
-                        continue
-                    # Check is there cell with only 1 solution
-                    solutions = self._available_vals(x,y)
-                    if len(solutions) == 1:
-                        self._set_cell_val(x, y, solutions[0])
-                        has_improved = True
-                    # Check is there unique value for this cell in row, col or block
-                    # Check row
-                    values = []
-                    for x1 in range(0, stt.elements_in_game_x):
-                        if x != x1:
-                            if self._get_cell_val(x1, y) == 0:
-                                values = values + self._available_vals(x1, y)
-                    for solution in solutions:
-                        if solution not in values:
-                            self._set_cell_val(x, y, solution)
-                            has_improved = True
-                            break
-                    # Check column
-                    values = []
-                    for y1 in range(0, stt.elements_in_game_y):
-                        if y != y1:
-                            if self._get_cell_val(x, y1) == 0:
-                                values = values + self._available_vals(x, y1)
-                    for solution in solutions:
-                        if solution not in values:
-                            self._set_cell_val(x, y, solution)
-                            has_improved = True
-                            break
-                    # Check block
-                    values = self._find_all_block_values_for_solve_sudoku(x, y)
-                    for solution in solutions:
-                        if solution not in values:
-                            self._set_cell_val(x, y, solution)
-                            has_improved = True
-                            break
-            is_solved = self._is_sudoku_valid()
-            if is_solved:
+        self._rng.shuffle(pos)
+        nodes = max(1, DIG_COUNT_NODES * 81 * 81 // (self._geo.cells * self._geo.cells))
+        for x, y in pos:
+            if count >= user_cells_count:
                 break
-        # Restore original table
-        count = 0
-        for y in range(0, stt.elements_in_game_y):
-            for x in range(0, stt.elements_in_game_x):
-                self._board[y][x][0] = table[count]
+            if deadline is not None and time.perf_counter() >= deadline:
+                return (count, True)
+            value = self._get_cell_val(x, y)
+            self._set_cell_val(x, y, 0, False, False, False)
+            if self._is_forced(self._geo.index(x, y), value) or self._count_solutions_limited(2, nodes) == 1:
                 count += 1
-        return is_solved
-        
-    def _find_all_block_values_for_solve_sudoku(self, x: int, y: int) -> list:
-        # Find block occupied values
-        vals_b = []
-        start_pos_x = int(x / self._stt.elements_in_block_x) * self._stt.elements_in_block_x
-        start_pos_y = int(y / self._stt.elements_in_block_y) * self._stt.elements_in_block_y
-        for pos_y in range(start_pos_y, start_pos_y + self._stt.elements_in_block_y):
-            for pos_x in range(start_pos_x, start_pos_x + self._stt.elements_in_block_x):
-                if self._board[pos_y][pos_x][0] == 0:
-                    if pos_y != y or pos_x != x:
-                        vals_b = vals_b + self._available_vals(pos_x, pos_y)
-        return vals_b
-
-
-    def _is_sudoku_valid(self):
-        result = True
-        for y in range(0, self._stt.elements_in_game_y):
-            for x in range(0, self._stt.elements_in_game_x):
-                cell = self._get_cell_val(x, y)
-                vals = self._available_vals(x, y)
-                if cell == 0:
-                    result = False
-                if len(vals) != 1:
-                    result = False
-                else:
-                    if cell != vals[0]:
-                        result = False
-        return result
+            else:
+                self._set_cell_val(x, y, value, predefinded=True)
+        return (count, False)
+
+    def _is_forced(self, index: int, value: int) -> bool:
+        """Returns True if singles propagation from units of empty cell writes 'value' in it.
+        Board is not changed.
+        """
+        cand = self._cand
+        candidates = cand.candidates(index)
+        # If peers leave only one value for cell, it is forced
+        if not candidates & (candidates - 1):
+            return True
+        is_consistent, assigned = cand.propagate(self._geo.cell_units[index], index)
+        forced = is_consistent and cand.values[index] == value
+        for changed in reversed(assigned):
+            cand.set_val(changed, 0)
+        return forced
+
+    def _count_solutions_limited(self, limit: int, nodes: int) -> int:
+        """Returns number of solutions of current board, counting stops at 'limit'.
+        If counting needs more than 'nodes' search nodes, returns 'limit'.
+        """
+        node_limit = backtrack_solver_cls.NodeLimit(nodes)
+        count = self._solvers.count(self._geo, self._cand.values, limit, node_limit)
+        if node_limit.exceeded:
+            return limit
+        return count
+
+    def close(self):
+        """Stops worker processes of parallel solver and hint thread, writes saved game and analysis cache.
+        Pool, autosave and hint threads are started again when needed.
+        """
+        self._solvers.shutdown()
+        if self._hint_worker is not None:
+            self._hint_worker.close()
+        if self._saver is not None:
+            self._autosave()
+            self._saver.close()
+        if self._cache_path is not None:
+            self._cache.save(self._cache_path)
 
+    @property
+    def board(self) -> board_cls.BoardView:
+        """Read only view, board[y][x] = (value, predefined, edited, correct)"""
+        return self._board.view()
+
+    @property
+    def rating(self) -> dict:
+        if not self._rating and self.active_game:
+            # Resumed game, rate the puzzle without user entries
+            self._rating = self._analyze(self._puzzle_values(), self._board.solution)[1]["rating"]
+        return self._rating
 
+    @property
+    def puzzle(self) -> list:
+        """Values of predefined cells of current game (puzzle without user entries)."""
+        return self._puzzle_values()
 
     @property
-    def board(self) -> list:
-        return self._board
+    def solution(self) -> list:
+        """Solution of current game."""
+        return list(self._board.solution)
+
+    def _puzzle_values(self) -> list:
+        """Returns values of predefined cells (puzzle without user entries)."""
+        return [value if flags & board_cls.PREDEFINED else 0 for value, flags in zip(self._board.values, self._board.flags)]
+
+    def puzzle_hash(self) -> str:
+        """Returns hash of current puzzle, same for all relabeled, swapped or transposed copies.
+        Raises ValueError if puzzle has conflicts (possible in editor mode).
+        """
+        return self._canonicalizer.puzzle_hash(self._puzzle_values())
 
 
 
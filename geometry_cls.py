@@ -0,0 +1,143 @@
+class Geometry():
+    """Describes the layout of a sudoku board and compiles it into lookup tables.
+
+    Cells are addressed by flat index (index = y * elements_x + x).
+    Units are rows, columns, regions and extra units, each unit is list of cell indexes:
+        units[0 .. rows-1]                  rows
+        units[rows .. rows+cols-1]          columns
+        units[block_units]                  regions (blocks, or irregular jigsaw regions)
+        units[extra_units]                  diagonals (Sudoku-X)
+    cell_units[index] = (row_unit, column_unit, region_unit, extra units ...)
+    regions = region number of every cell (None = rectangular blocks block_x * block_y)
+    diagonals = True if both main diagonals are units too
+    All solvers, rating and candidates work only with these tables, so
+    variant of sudoku is just another list of units.
+    """
+    def __init__(self, elements_x: int, elements_y: int, block_x: int, block_y: int, regions: tuple = None, diagonals: bool = False):
+        self.elements_x = elements_x
+        self.elements_y = elements_y
+        self.block_x = block_x
+        self.block_y = block_y
+        self.regions = tuple(regions) if regions is not None else None
+        self.diagonals = diagonals
+        self.size = elements_x  # Number of different values (1 - size)
+        self.cells = elements_x * elements_y
+        self.full_mask = (1 << self.size) - 1  # All values available
+        # Build units
+        self.units = []
+        for y in range(0, elements_y):
+            self.units.append([y * elements_x + x for x in range(0, elements_x)])
+        for x in range(0, elements_x):
+            self.units.append([y * elements_x + x for y in range(0, elements_y)])
+        if self.regions is None:
+            for start_y in range(0, elements_y, block_y):
+                for start_x in range(0, elements_x, block_x):
+                    block = []
+                    for y in range(start_y, start_y + block_y):
+                        for x in range(start_x, start_x + block_x):
+                            block.append(y * elements_x + x)
+                    self.units.append(block)
+        else:
+            for region in range(0, max(self.regions) + 1):
+                self.units.append([index for index, cell_region in enumerate(self.regions) if cell_region == region])
+        self.row_units = range(0, elements_y)
+        self.col_units = range(elements_y, elements_y + elements_x)
+        self.block_units = range(elements_y + elements_x, len(self.units))
+        if diagonals:
+            self.units.append([i * elements_x + i for i in range(0, elements_x)])
+            self.units.append([i * elements_x + elements_x - 1 - i for i in range(0, elements_x)])
+        self.extra_units = range(self.block_units.stop, len(self.units))
+        # Build cell -> units and cell -> peers tables
+        self.cell_units = [[] for i in range(0, self.cells)]
+        for unit_index, unit in enumerate(self.units):
+            for index in unit:
+                self.cell_units[index].append(unit_index)
+        self.cell_units = [tuple(units) for units in self.cell_units]
+        self.peers = []
+        for index in range(0, self.cells):
+            peers = set()
+            for unit_index in self.cell_units[index]:
+                peers.update(self.units[unit_index])
+            peers.discard(index)
+            self.peers.append(tuple(sorted(peers)))
+        self.region_borders = self._region_borders()
+
+    def _region_borders(self) -> list:
+        """Lines between cells of different regions and around board, in cell units.
+        Returns [((x1, y1), (x2, y2)), ...], neighbouring pieces of one line are joined.
+        """
+        width = self.elements_x
+        height = self.elements_y
+        region = [self.cell_units[index][2] for index in range(0, self.cells)]
+        borders = []
+        # Vertical lines, line x is left of column x
+        for x in range(0, width + 1):
+            start = None
+            for y in range(0, height + 1):
+                edge = y < height and (x == 0 or x == width or region[y * width + x - 1] != region[y * width + x])
+                if edge and start is None:
+                    start = y
+                elif not edge and start is not None:
+                    borders.append(((x, start), (x, y)))
+                    start = None
+        # Horizontal lines, line y is above row y
+        for y in range(0, height + 1):
+            start = None
+            for x in range(0, width + 1):
+                edge = x < width and (y == 0 or y == height or region[(y - 1) * width + x] != region[y * width + x])
+                if edge and start is None:
+                    start = x
+                elif not edge and start is not None:
+                    borders.append(((start, y), (x, y)))
+                    start = None
+        return borders
+
+    @property
+    def is_variant(self) -> bool:
+        """True if units are not only rows, columns and rectangular blocks."""
+        return self.regions is not None or self.diagonals
+
+    @property
+    def key(self) -> tuple:
+        """Identifies layout, get_geometry_by_key(key) returns the same geometry.
+        Classic layout: (elements_x, elements_y, block_x, block_y)
+        Variant: classic key + (diagonals, region of every cell ...) (regions empty for blocks)
+        """
+        key = (self.elements_x, self.elements_y, self.block_x, self.block_y)
+        if self.is_variant:
+            key += (int(self.diagonals),) + (self.regions or ())
+        return key
+
+    def index(self, x: int, y: int) -> int:
+        return y * self.elements_x + x
+
+    def position(self, index: int) -> tuple:
+        return (index % self.elements_x, index // self.elements_x)
+
+
+JIGSAW_LAYOUTS = 8  # Number of compiled jigsaw layouts kept in cache
+
+_geometry_cache = {}
+
+
+def get_geometry(elements_x: int, elements_y: int, block_x: int, block_y: int, regions: tuple = None, diagonals: bool = False) -> Geometry:
+    """Returns compiled Geometry, every layout is compiled only once.
+    Every jigsaw game has new regions, so only newest JIGSAW_LAYOUTS jigsaw layouts are kept.
+    """
+    key = (elements_x, elements_y, block_x, block_y, tuple(regions) if regions is not None else None, bool(diagonals))
+    if key not in _geometry_cache:
+        if regions is not None:
+            jigsaw = [cached for cached in _geometry_cache if cached[4] is not None]
+            if len(jigsaw) >= JIGSAW_LAYOUTS:
+                del _geometry_cache[jigsaw[0]]
+        _geometry_cache[key] = Geometry(elements_x, elements_y, block_x, block_y, regions, diagonals)
+    return _geometry_cache[key]
+
+
+def get_geometry_by_key(key: tuple) -> Geometry:
+    """Returns geometry with Geometry.key equal to 'key'."""
+    elements_x, elements_y, block_x, block_y = key[:4]
+    if len(key) == 4:
+        return get_geometry(elements_x, elements_y, block_x, block_y)
+    regions = tuple(key[5:]) or None
+    return get_geometry(elements_x, elements_y, block_x, block_y, regions, bool(key[4]))
@@ -0,0 +1,248 @@
+import random
+import geometry_cls
+import backtrack_solver_cls
+
+
+_searched_grids = {}  # Geometry key -> grid found by search (one per process)
+
+
+# Valid solution grids used as seeds, key = (elements_x, elements_y, block_x, block_y)
+SEED_GRIDS = {
+    (9, 9, 3, 3): [
+        "294816753876253419531974862652741398387695241149382576763529184918437625425168937",
+        "452916873619378452783524196564739281271485369398261745925843617836197524147652938",
+        "546829713731645892892317456269574381187293645453186927318462579674951238925738164",
+    ],
+    (6, 6, 3, 2): [
+        "412563563412341625256341134256625134",
+        "316542452613245361631425524136163254",
+        "561342324165452613136524213456645231",
+    ],
+}
+
+
+LINEAR_TRIES = 200  # Random matrices tried by linear_grid()
+
+
+def _prime_power(number: int) -> tuple:
+    """Returns (p, k) with p prime and number = p ** k, or None."""
+    for prime in range(2, number + 1):
+        if number % prime == 0:
+            power = 0
+            rest = number
+            while rest % prime == 0:
+                rest //= prime
+                power += 1
+            return (prime, power) if rest == 1 else None
+    return None
+
+
+def _is_invertible(matrix: list, prime: int) -> bool:
+    """Gaussian elimination of square matrix (list of rows) modulo prime."""
+    rows = [list(row) for row in matrix]
+    size = len(rows)
+    for col in range(0, size):
+        pivot = next((row for row in range(col, size) if rows[row][col] % prime), None)
+        if pivot is None:
+            return False
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        inverse = pow(rows[col][col], prime - 2, prime)
+        for row in range(col + 1, size):
+            factor = rows[row][col] * inverse % prime
+            if factor:
+                rows[row] = [(value - factor * pivot_value) % prime for value, pivot_value in zip(rows[row], rows[col])]
+    return True
+
+
+def linear_grid(geometry: geometry_cls.Geometry, rng=random) -> list:
+    """Returns solved grid made by random linear map, or None if blocks are
+    not square with prime power side (4, 9, 16 and 25 cells in block).
+    Row y = band * b + row in band and column x = stack * b + column in
+    stack give four digits (b = block side), every digit is vector of k
+    numbers modulo p (b = p ** k), and value is M * (band, row, stack,
+    column) for random matrix M. Each unit has every value once if the
+    part of M for digits that change along the unit is invertible, which
+    is checked for rows, columns, blocks and (if geometry has them) both
+    main diagonals. Grid is built without search, in any board size.
+    """
+    geo = geometry
+    side = geo.block_x
+    field = _prime_power(side)
+    if side != geo.block_y or field is None:
+        return None
+    prime, power = field
+    width = 2 * power  # Numbers in value vector (two digits)
+
+    def columns(matrix, digit):
+        return [row[digit * power:(digit + 1) * power] for row in matrix]
+
+    def joined(first, second):
+        return [left + right for left, right in zip(first, second)]
+
+    def combined(first, second, sign):
+        return [[(left + sign * right) % prime for left, right in zip(row_first, row_second)] for row_first, row_second in zip(first, second)]
+
+    for attempt in range(0, LINEAR_TRIES):
+        matrix = [[rng.randrange(0, prime) for col in range(0, 4 * power)] for row in range(0, width)]
+        band, row, stack, col = (columns(matrix, digit) for digit in range(0, 4))
+        parts = [joined(stack, col), joined(band, row), joined(row, col)]
+        if geo.diagonals:
+            # Main diagonal: stack = band, column = row; anti-diagonal: stack = -band + c, column = -row + c
+            parts.append(joined(combined(band, stack, 1), combined(row, col, 1)))
+            parts.append(joined(combined(band, stack, -1), combined(row, col, -1)))
+        if all(_is_invertible(part, prime) for part in parts):
+            break
+    else:
+        return None
+    # Digit -> vector of base p numbers
+    vectors = [[digit // prime ** place % prime for place in range(0, power)] for digit in range(0, side)]
+    grid = []
+    for y in range(0, geo.elements_y):
+        for x in range(0, geo.elements_x):
+            digits = vectors[y // side] + vectors[y % side] + vectors[x // side] + vectors[x % side]
+            vector = [sum(coefficient * digit for coefficient, digit in zip(matrix_row, digits)) % prime for matrix_row in matrix]
+            value = 0
+            for number in reversed(vector):
+                value = value * prime + number
+            grid.append(value + 1)
+    return grid
+
+
+class GridGenerator():
+    """Creates solved sudoku grids by transforming valid seed grids.
+
+    Every transformation keeps grid valid:
+        - digit relabeling
+        - row swaps within band, band swaps (band = row of blocks)
+        - column swaps within stack, stack swaps (stack = column of blocks)
+        - transposition (only if blocks are square)
+    so new grid is created without any search or dead ends.
+    Variants (diagonals, jigsaw regions) are not kept valid by these
+    transformations except relabeling, so their seed grids (e.g. the grid
+    jigsaw regions were made from) are only relabeled. Without seed grids
+    they are built by linear_grid() if blocks are square, otherwise one
+    grid found by search is relabeled and mixed by cycle swaps (_mix()).
+    seeds = solved grids of this geometry (None = built-in seed grids)
+    """
+    def __init__(self, geometry: geometry_cls.Geometry, seeds: list = None):
+        self.geometry = geometry
+        self._seeds = [list(seed) for seed in seeds or []]
+        if geometry.is_variant or self._seeds:
+            return
+        for seed in SEED_GRIDS.get(geometry.key, []):
+            self._seeds.append([int(value) for value in seed])
+        if not self._seeds:
+            self._seeds.append(self._pattern_grid())
+
+    def _pattern_grid(self) -> list:
+        """Valid grid for any block layout, every row is shifted previous row."""
+        geo = self.geometry
+        grid = []
+        for y in range(0, geo.elements_y):
+            shift = geo.block_x * (y % geo.block_y) + y // geo.block_y
+            for x in range(0, geo.elements_x):
+                grid.append((shift + x) % geo.size + 1)
+        return grid
+
+    def _shuffled_lines(self, lines_in_group: int, groups: int, rng) -> list:
+        # Shuffle groups (bands or stacks) and lines inside every group
+        group_order = list(range(0, groups))
+        rng.shuffle(group_order)
+        lines = []
+        for group in group_order:
+            inner = list(range(0, lines_in_group))
+            rng.shuffle(inner)
+            lines.extend([group * lines_in_group + line for line in inner])
+        return lines
+
+    def new_grid(self, rng=random) -> list:
+        """Returns flat list with values of new solved grid."""
+        geo = self.geometry
+        if geo.is_variant and not self._seeds:
+            grid = linear_grid(geo, rng)
+            if grid is not None:
+                return grid
+            # Relabeled and mixed grid from search, search is done only once
+            seed = self._searched_grid()
+        else:
+            seed = rng.choice(self._seeds)
+        width = geo.elements_x
+        if geo.is_variant:
+            rows = range(0, geo.elements_y)
+            cols = range(0, geo.elements_x)
+        else:
+            rows = self._shuffled_lines(geo.block_y, geo.elements_y // geo.block_y, rng)
+            cols = self._shuffled_lines(geo.block_x, geo.elements_x // geo.block_x, rng)
+        labels = list(range(1, geo.size + 1))
+        rng.shuffle(labels)
+        labels.insert(0, 0)
+        grid = []
+        for row in rows:
+            start = row * width
+            for col in cols:
+                grid.append(labels[seed[start + col]])
+        if geo.block_x == geo.block_y and not geo.is_variant and rng.random() < 0.5:
+            grid = [grid[x * width + y] for y in range(0, width) for x in range(0, width)]
+        if geo.is_variant and not self._seeds:
+            grid = self._mix(grid, rng)
+        return grid
+
+    def mixed_grid(self, rng=random, moves: int = None) -> list:
+        """Returns new_grid() changed by random cycle swaps (see _mix()), so
+        grid has no pattern of seed grid.
+        moves = number of swaps (default one per cell)
+        """
+        return self._mix(self.new_grid(rng), rng, moves)
+
+    def _mix(self, grid: list, rng, moves: int = None) -> list:
+        """Changes grid by random cycle swaps. Swap takes two rows of one
+        band (or two columns of one stack) and swaps cells of both lines in
+        some columns: after the first swapped column, the value that came in
+        is repeated in the line, so its column is swapped too, until values
+        close the cycle. Columns (rows) and blocks keep the same values, so
+        grid stays solved. Swap that breaks a diagonal is undone.
+        Not for jigsaw regions.
+        """
+        geo = self.geometry
+        diagonals = [geo.units[unit] for unit in geo.extra_units]
+        if moves is None:
+            moves = geo.cells
+        for move in range(0, moves):
+            if rng.random() < 0.5:
+                lines = [geo.units[unit] for unit in geo.row_units]
+                group = geo.block_y
+            else:
+                lines = [geo.units[unit] for unit in geo.col_units]
+                group = geo.block_x
+            first_line = rng.randrange(0, len(lines))
+            second_line = first_line - first_line % group + rng.randrange(0, group)
+            if first_line == second_line:
+                continue
+            first = lines[first_line]
+            second = lines[second_line]
+            position = {grid[index]: place for place, index in enumerate(first)}
+            place = rng.randrange(0, len(first))
+            closing = grid[first[place]]
+            swapped = []
+            while True:
+                value = grid[second[place]]
+                grid[first[place]], grid[second[place]] = value, grid[first[place]]
+                swapped.append(place)
+                if value == closing:
+                    break
+                place = position[value]
+            if any(len({grid[index] for index in unit}) != geo.size for unit in diagonals):
+                for place in swapped:
+                    grid[first[place]], grid[second[place]] = grid[second[place]], grid[first[place]]
+        return grid
+
+    def _searched_grid(self) -> list:
+        """Returns grid of geometry found by search of empty board.
+        Search takes up to a few hundred milliseconds on biggest boards, so
+        it is done once and its grid is kept for all generators.
+        """
+        geo = self.geometry
+        if geo.key not in _searched_grids:
+            solver = backtrack_solver_cls.BacktrackingSolver(geo)
+            _searched_grids[geo.key] = solver.solve([0] * geo.cells, 1)[0]
+        return _searched_grids[geo.key]
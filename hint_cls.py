@@ -0,0 +1,133 @@
+import threading
+import time
+import geometry_cls
+import candidates_cls
+import rating_cls
+
+
+TECHNIQUE_LEVELS = {name: level for level, (name, points) in enumerate(rating_cls.TECHNIQUES)}
+WORKER_BUDGET_MS = 100  # Time limit for hint search in background on 9x9 board
+
+
+def find_hint(geometry: geometry_cls.Geometry, rater: rating_cls.PuzzleRater, cand: candidates_cls.CandidateMasks,
+              solution: bytes, budget_ms: float, is_stale=None) -> tuple:
+    """Returns hint for board loaded in 'cand' (see SudokuGameLogic.user_hint()).
+    Techniques from easiest to hardest are applied until some value is
+    written. If that takes more than 'budget_ms' or no technique can be
+    used, value is taken from solution for empty cell with fewest candidates.
+    is_stale = function, search is abandoned (returns None) when it returns True
+    """
+    geo = geometry
+    values = cand.values
+    # Check all bad entries from user and return one that needs to be changed
+    for index in range(0, geo.cells):
+        if values[index] and values[index] != solution[index]:
+            hint_x, hint_y = geo.position(index)
+            return (hint_x, hint_y, 0, "wrong_value", ((hint_x, hint_y),))
+    deadline = time.perf_counter() + budget_ms / 1000
+    # Search with techniques, candidates are computed once on load
+    rater.load(values)
+    hardest = -1
+    cells = []
+    while time.perf_counter() < deadline:
+        if is_stale is not None and is_stale():
+            return None
+        technique = rater.next_step()
+        if not technique:
+            break
+        index, hint_val, step_cells = rater.last_step
+        hardest = max(hardest, TECHNIQUE_LEVELS[technique])
+        for cell in step_cells:
+            if cell not in cells:
+                cells.append(cell)
+        if index >= 0:
+            hint_x, hint_y = geo.position(index)
+            return (hint_x, hint_y, hint_val, rating_cls.TECHNIQUES[hardest][0], tuple(geo.position(cell) for cell in cells))
+    # Techniques are not enough or too slow, reveal value from solution
+    index = cand.fewest_candidates_cell()
+    if index < 0:
+        return None
+    hint_x, hint_y = geo.position(index)
+    return (hint_x, hint_y, solution[index], "solution", ((hint_x, hint_y),))
+
+
+class HintWorker():
+    """Computes hint for newest board in background thread.
+
+    submit() is called after every change of board with board version
+    (counter that grows with every change) and copy of board. Only the
+    newest board is kept, and search for older board is abandoned as soon
+    as newer board is submitted.
+    result(version) returns (True, hint) if hint for that version is ready,
+    otherwise (False, None), so hint for old board is never returned.
+    Worker has its own candidates and rater, so it never touches game state.
+    close() stops the thread, next submit() starts it again.
+    """
+    def __init__(self, budget_ms: float = WORKER_BUDGET_MS):
+        self.budget_ms = budget_ms  # Scaled to board size like HINT_BUDGET_MS
+        self._pending = None
+        self._latest = 0  # Newest submitted version
+        self._version = -1  # Version of 'hint'
+        self._hint = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = None
+        self._engines = {}  # geometry key -> (CandidateMasks, PuzzleRater)
+
+    def submit(self, version: int, geometry: geometry_cls.Geometry, values: bytes, solution: bytes):
+        with self._lock:
+            self._pending = (version, geometry, values, solution)
+            self._latest = version
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="HintWorker", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def result(self, version: int) -> tuple:
+        with self._lock:
+            if self._version == version:
+                return (True, self._hint)
+        return (False, None)
+
+    def close(self):
+        with self._lock:
+            thread = self._thread
+            self._stop = True
+        if thread is not None:
+            self._wake.set()
+            thread.join()
+            self._thread = None
+
+    def _is_stale(self, version: int) -> bool:
+        return self._latest != version or self._stop
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                job = self._pending
+                self._pending = None
+                stop = self._stop
+            if stop:
+                break
+            if job is None:
+                continue
+            version, geo, values, solution = job
+            engines = self._engines.get(geo.key)
+            if engines is None:
+                if geo.regions is not None:
+                    # Jigsaw layout changes with every game, engines of old layouts are not needed
+                    self._engines = {key: engines for key, engines in self._engines.items() if engines[0].geometry.regions is None}
+                engines = (candidates_cls.CandidateMasks(geo), rating_cls.PuzzleRater(geo))
+                self._engines[geo.key] = engines
+            cand, rater = engines
+            cand.load(values)
+            hint = find_hint(geo, rater, cand, solution, self.budget_ms * geo.cells / 81, lambda: self._is_stale(version))
+            with self._lock:
+                # Board could change while hint was searched
+                if self._latest == version:
+                    self._version = version
+                    self._hint = hint
@@ -53,6 +53,7 @@ while run:
     game.show_table()
     pygame.display.flip()
 
+game.gui.close()
 if stt.save_data_to_file() != "":
     print ("Error. The settings file could not be saved. (settings.txt)")
 
@@ -0,0 +1,107 @@
+import sys
+from array import array
+
+
+# Bit layout of one move (32 bit unsigned integer)
+_INDEX_BITS = 10  # Cell index, boards up to 1024 cells (25x25 = 625)
+_VALUE_BITS = 5  # Values 0 - 31
+_FLAG_BITS = 3  # PREDEFINED, EDITED and CORRECT
+
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_FLAG_MASK = (1 << _FLAG_BITS) - 1
+_INDEX_MASK = (1 << _INDEX_BITS) - 1
+_OLD_VALUE_SHIFT = _INDEX_BITS
+_NEW_VALUE_SHIFT = _OLD_VALUE_SHIFT + _VALUE_BITS
+_OLD_FLAGS_SHIFT = _NEW_VALUE_SHIFT + _VALUE_BITS
+_NEW_FLAGS_SHIFT = _OLD_FLAGS_SHIFT + _FLAG_BITS
+
+MAX_CELLS = 1 << _INDEX_BITS
+
+
+def check_moves(data: bytes, position: int, cells: int, size: int):
+    """Checks moves saved with MoveJournal.to_bytes() for board with 'cells'
+    cells and values 1 - 'size', raises ValueError if some move can't be applied.
+    """
+    if len(data) % 4:
+        raise ValueError("Journal has wrong size")
+    moves = array("I")
+    moves.frombytes(data)
+    if sys.byteorder == "big":
+        moves.byteswap()
+    if not 0 <= position <= len(moves):
+        raise ValueError("Journal position out of range")
+    for move in moves:
+        if (move & _INDEX_MASK >= cells or move >> _OLD_VALUE_SHIFT & _VALUE_MASK > size
+                or move >> _NEW_VALUE_SHIFT & _VALUE_MASK > size or move >> _NEW_FLAGS_SHIFT + _FLAG_BITS):
+            raise ValueError("Journal move out of range")
+
+
+class MoveJournal():
+    """Undo/redo history of cell changes.
+
+    Every move is one 32 bit integer in array (4 bytes per move) with
+    cell index, old value, new value, old flags and new flags, so the
+    board is never copied. Moves after 'position' can be redone, new
+    move removes them.
+    undo() and redo() return (index, value, flags) that has to be written
+    in cell, or None if there is nothing to undo (redo).
+    """
+    def __init__(self):
+        self._moves = array("I")
+        self.position = 0  # Number of moves that are applied
+
+    def clear(self):
+        self._moves = array("I")
+        self.position = 0
+
+    def __len__(self) -> int:
+        return len(self._moves)
+
+    def record(self, index: int, old_value: int, new_value: int, old_flags: int, new_flags: int):
+        if self.position < len(self._moves):
+            del self._moves[self.position:]
+        self._moves.append(index
+                           | old_value << _OLD_VALUE_SHIFT
+                           | new_value << _NEW_VALUE_SHIFT
+                           | old_flags << _OLD_FLAGS_SHIFT
+                           | new_flags << _NEW_FLAGS_SHIFT)
+        self.position += 1
+
+    def to_bytes(self) -> bytes:
+        """Returns moves as little endian 32 bit integers."""
+        if sys.byteorder == "big":
+            moves = array("I", self._moves)
+            moves.byteswap()
+            return moves.tobytes()
+        return self._moves.tobytes()
+
+    def load_bytes(self, data: bytes, position: int):
+        """Loads moves saved with to_bytes()."""
+        moves = array("I")
+        moves.frombytes(data)
+        if sys.byteorder == "big":
+            moves.byteswap()
+        if not 0 <= position <= len(moves):
+            raise ValueError("Journal position out of range")
+        self._moves = moves
+        self.position = position
+
+    def can_undo(self) -> bool:
+        return self.position > 0
+
+    def can_redo(self) -> bool:
+        return self.position < len(self._moves)
+
+    def undo(self) -> tuple:
+        if not self.position:
+            return None
+        self.position -= 1
+        move = self._moves[self.position]
+        return (move & _INDEX_MASK, move >> _OLD_VALUE_SHIFT & _VALUE_MASK, move >> _OLD_FLAGS_SHIFT & _FLAG_MASK)
+
+    def redo(self) -> tuple:
+        if self.position >= len(self._moves):
+            return None
+        move = self._moves[self.position]
+        self.position += 1
+        return (move & _INDEX_MASK, move >> _NEW_VALUE_SHIFT & _VALUE_MASK, move >> _NEW_FLAGS_SHIFT & _FLAG_MASK)
@@ -0,0 +1,88 @@
+import os
+import multiprocessing
+import concurrent.futures
+import geometry_cls
+import backtrack_solver_cls
+
+
+# Worker process state
+_worker_stop_event = None
+_worker_solvers = {}
+
+
+def _init_worker(stop_event):
+    global _worker_stop_event
+    _worker_stop_event = stop_event
+
+
+def _solve_subtree(geometry_key: tuple, values: list, limit: int) -> list:
+    """Runs in worker process, returns up to 'limit' solutions of subtree."""
+    solver = _worker_solvers.get(geometry_key)
+    if solver is None:
+        solver = backtrack_solver_cls.BacktrackingSolver(geometry_cls.get_geometry_by_key(geometry_key))
+        _worker_solvers[geometry_key] = solver
+    if _worker_stop_event.is_set():
+        return []
+    return solver.solve(values, limit, _worker_stop_event)
+
+
+class ParallelSolver():
+    """Splits backtracking search tree and solves subtrees in process pool.
+
+    Search tree is split at first 'split_depth' branching cells, every
+    subtree is solved by BacktrackingSolver in worker process.
+    Solve mode: first worker that finds solution stops all others.
+    Count mode: counts from all workers are summed, workers are stopped
+    when sum reaches limit.
+    Pool is created on first use and kept until shutdown().
+    """
+    def __init__(self, geometry: geometry_cls.Geometry, workers: int = None, split_depth: int = 3):
+        self.geometry = geometry
+        self.workers = workers or os.cpu_count() or 1
+        self.split_depth = split_depth
+        self._splitter = backtrack_solver_cls.BacktrackingSolver(geometry)
+        self._pool = None
+        self._stop_event = None
+
+    def _get_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._pool is None:
+            self._stop_event = multiprocessing.Event()
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._stop_event,))
+        return self._pool
+
+    def _run(self, values: list, limit: int) -> list:
+        subtrees = self._splitter.split(values, self.split_depth)
+        if not subtrees:
+            return []
+        pool = self._get_pool()
+        self._stop_event.clear()
+        key = self.geometry.key
+        futures = [pool.submit(_solve_subtree, key, subtree, limit) for subtree in subtrees]
+        solutions = []
+        for future in concurrent.futures.as_completed(futures):
+            solutions.extend(future.result())
+            if len(solutions) >= limit:
+                self._stop_event.set()
+                for other in futures:
+                    other.cancel()
+                break
+        # Wait for running workers to notice stop event
+        concurrent.futures.wait(futures)
+        return solutions[:limit]
+
+    def solve(self, values: list, limit: int = 1) -> list:
+        """Returns list with up to 'limit' solutions of board."""
+        return self._run(values, limit)
+
+    def count(self, values: list, limit: int = 2) -> int:
+        """Returns number of solutions summed across workers, counting stops at 'limit'."""
+        return len(self._run(values, limit))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._stop_event.set()
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
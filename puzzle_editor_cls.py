@@ -0,0 +1,84 @@
+import geometry_cls
+import candidates_cls
+import backtrack_solver_cls
+
+
+# Status of edited puzzle
+CONTRADICTION = "contradiction"  # Some value is repeated in row, column or block
+NO_SOLUTION = "no_solution"
+UNIQUE = "unique"
+MULTIPLE = "multiple"
+
+
+class SolutionCounter():
+    """Counts solutions (0, 1 or 2 = more than one) of puzzle that changes one cell at a time.
+
+    Up to two solutions found by last search are kept as witnesses. Every
+    given that is added can only remove solutions, and every given that is
+    removed can only add them, so most keystrokes are answered from
+    witnesses without search:
+        - added given matches both witnesses: still multiple
+        - puzzle was unique or had no solution: added given keeps it or
+          leaves no solution
+        - given removed and there are two witnesses: still multiple
+    Otherwise board is searched for up to two solutions again.
+    searches counts searches, to see how many keystrokes needed one.
+    """
+    def __init__(self, geometry: geometry_cls.Geometry):
+        self.geometry = geometry
+        self._cand = candidates_cls.CandidateMasks(geometry)
+        self._solver = backtrack_solver_cls.BacktrackingSolver(geometry)
+        self.searches = 0
+        self.reset()
+
+    def reset(self):
+        """Starts with empty board (it has more than one solution)."""
+        self._cand.reset()
+        self._witnesses = None  # None = unknown, search is needed
+        self.count = 2
+        self.status = MULTIPLE
+
+    @property
+    def values(self) -> list:
+        return self._cand.values
+
+    def set_val(self, index: int, value: int) -> str:
+        """Changes one cell (0 = remove given), returns new status."""
+        cand = self._cand
+        old_val = cand.values[index]
+        if old_val == value:
+            return self.status
+        cand.set_val(index, value)
+        if cand.has_conflicts():
+            # Witnesses of puzzle with repeated value are not known
+            self._witnesses = None
+            self.count = 0
+            self.status = CONTRADICTION
+            return self.status
+        witnesses = self._witnesses
+        count = -1  # Unknown
+        if witnesses is not None:
+            if value:
+                kept = [solution for solution in witnesses if solution[index] == value]
+                if not old_val and self.count < 2:
+                    # Solution set only shrinks, and every solution was a witness
+                    count = len(kept)
+                elif len(kept) == 2:
+                    count = 2
+                witnesses = kept
+            elif len(witnesses) == 2:
+                count = 2
+        if count < 0:
+            witnesses = self._solver.solve(list(cand.values), 2)
+            count = len(witnesses)
+            self.searches += 1
+        self._witnesses = witnesses
+        self.count = count
+        self.status = (NO_SOLUTION, UNIQUE, MULTIPLE)[count]
+        return self.status
+
+    def solution(self) -> list:
+        """Returns solution of unique puzzle, or None."""
+        if self.status != UNIQUE:
+            return None
+        return list(self._witnesses[0])
@@ -0,0 +1,127 @@
+import os
+import time
+import random
+import concurrent.futures
+import settings_cls
+import game_logic_cls
+
+
+# Worker process state
+_worker_settings = None
+_worker_logic = None
+
+
+def _init_worker(setting_object: settings_cls.Setting):
+    global _worker_settings, _worker_logic
+    # Worker only generates and rates, so it needs no parallel solver and no cache
+    _worker_settings = setting_object
+    _worker_logic = game_logic_cls.SudokuGameLogic(setting_object, workers=1, cache_size=0)
+
+
+def _generate_candidate(game: tuple, minimal: bool, puzzle_id: int) -> dict:
+    """Runs in worker process, generates and rates one puzzle.
+    game = (board size, variant, level, level points) from settings of search
+        (worker keeps settings from pool creation, so they are set for every candidate)
+    """
+    stt = _worker_settings
+    stt.game_size, stt.game_variant, stt.game_level, stt.level_points = game
+    logic = _worker_logic
+    logic.start_new_game(minimal, puzzle_id)
+    return {
+        "puzzle_id": puzzle_id,
+        "puzzle": bytes(logic.puzzle),
+        "solution": bytes(logic.solution),
+        "rating": logic.rating,
+    }
+
+
+class PuzzleSearch():
+    """Generates puzzles in process pool and keeps those with grade in target band.
+
+    Every candidate is seed addressable puzzle, so accepted puzzle can be
+    started again with SudokuGameLogic.start_new_game(minimal, puzzle_id)
+    with the same board size, variant and level (level points).
+    search() returns accepted puzzles as they arrive, workers are kept busy
+    with 'workers' * IN_FLIGHT candidates.
+    stats (dict):
+        candidates (int): number of rated candidates
+        accepted (int): number of candidates with grade in band
+        elapsed_s (float): time of last search
+        candidates_per_s (float): rated candidates per second
+        acceptance_rate (float): accepted / candidates
+    Pool is created on first use and kept until shutdown().
+    """
+    IN_FLIGHT = 2  # Submitted candidates per worker
+
+    def __init__(self, setting_object: settings_cls.Setting, workers: int = None):
+        self._stt = setting_object
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self.stats = {}
+
+    def _get_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._stt,))
+        return self._pool
+
+    def search(self, grades: tuple, count: int = 1, minimal: bool = False, max_candidates: int = None, deadline_ms: float = None, seed: int = None):
+        """Yields puzzles (dict with puzzle_id, puzzle, solution, rating) with
+        grades[0] <= rating grade <= grades[1], until 'count' puzzles are found.
+        Board size, variant and level (number of empty cells) are taken from
+        settings when search starts.
+        Search also stops after 'max_candidates' candidates or 'deadline_ms'
+        (None = no limit), so fewer puzzles can be returned.
+        seed = seed of puzzle_id sequence (None = random), same seed rates the same candidates.
+        """
+        low, high = grades
+        stt = self._stt
+        game = (stt.game_size, stt.game_variant, stt.game_level, stt.level_points)
+        ids = random.Random(seed)
+        pool = self._get_pool()
+        start = time.perf_counter()
+        deadline = None if deadline_ms is None else start + deadline_ms / 1000
+        self.stats = {"candidates": 0, "accepted": 0, "elapsed_s": 0.0, "candidates_per_s": 0.0, "acceptance_rate": 0.0}
+        submitted = 0
+        running = set()
+        try:
+            while True:
+                # Keep workers busy
+                while len(running) < self.workers * self.IN_FLIGHT and (max_candidates is None or submitted < max_candidates):
+                    running.add(pool.submit(_generate_candidate, game, minimal, ids.getrandbits(64)))
+                    submitted += 1
+                if not running:
+                    break
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                done, running = concurrent.futures.wait(running, timeout, concurrent.futures.FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    result = future.result()
+                    accepted = low <= result["rating"]["grade"] <= high
+                    self._count(start, accepted)
+                    if accepted:
+                        yield result
+                        if self.stats["accepted"] >= count:
+                            return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+        finally:
+            for future in running:
+                future.cancel()
+
+    def _count(self, start: float, accepted: bool):
+        stats = self.stats
+        stats["candidates"] += 1
+        stats["accepted"] += accepted
+        stats["elapsed_s"] = time.perf_counter() - start
+        if stats["elapsed_s"] > 0:
+            stats["candidates_per_s"] = stats["candidates"] / stats["elapsed_s"]
+        stats["acceptance_rate"] = stats["accepted"] / stats["candidates"]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
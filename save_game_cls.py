@@ -0,0 +1,142 @@
+import os
+import struct
+import threading
+import settings_cls
+import move_journal_cls
+
+
+SAVE_FILE = "savegame.bin"
+MAGIC = b"SDKS"
+FORMAT_VERSION = 2  # Version 1 has no variant part, it is still loaded
+
+# magic, version, elements_x, elements_y, block_x, block_y, journal position, journal moves
+_HEADER = struct.Struct("<4sBBBBBII")
+# diagonals, regions (1 = region of every cell follows, one byte per cell)
+_VARIANT = struct.Struct("<BB")
+
+
+def encode_game(geometry_key: tuple, values: bytes, flags: bytes, solution: bytes, journal: bytes, position: int) -> bytes:
+    """Packs game into bytes:
+        header (_HEADER)
+        variant (_VARIANT), followed by jigsaw regions
+        values, flags, solution (one byte per cell each)
+        journal moves (4 bytes per move)
+    Puzzle is not stored separately, predefined cells have PREDEFINED flag.
+    """
+    elements_x, elements_y, block_x, block_y = geometry_key[:4]
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, elements_x, elements_y, block_x, block_y, position, len(journal) // 4)
+    diagonals = geometry_key[4] if len(geometry_key) > 4 else 0
+    regions = bytes(geometry_key[5:])
+    variant = _VARIANT.pack(diagonals, 1 if regions else 0)
+    return b"".join((header, variant, regions, values, flags, solution, journal))
+
+
+def decode_game(data: bytes) -> tuple:
+    """Returns (geometry_key, values, flags, solution, journal, position).
+    Raises ValueError if data is not a saved game of known version, or if
+    board size, some value, flag, region or journal move is out of range, so
+    decoded game can always be loaded.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Saved game is too short")
+    magic, version, elements_x, elements_y, block_x, block_y, position, moves = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a saved game")
+    if version not in (1, FORMAT_VERSION):
+        raise ValueError(f"Unsupported saved game version {version}")
+    size = elements_x
+    if (not 4 <= size <= settings_cls.MAX_BOARD_SIZE or elements_y != size
+            or block_y != settings_cls.block_height(size) or block_y < 2 or block_x != size // block_y):
+        raise ValueError("Saved game has unsupported board size")
+    cells = elements_x * elements_y
+    key = (elements_x, elements_y, block_x, block_y)
+    start = _HEADER.size
+    if version > 1:
+        if len(data) < start + _VARIANT.size:
+            raise ValueError("Saved game is too short")
+        diagonals, has_regions = _VARIANT.unpack_from(data, start)
+        start += _VARIANT.size
+        if diagonals > 1 or has_regions > 1:
+            raise ValueError("Saved game has unknown variant")
+        regions = data[start:start + cells] if has_regions else b""
+        start += len(regions)
+        if regions and any(regions.count(region) != size for region in range(0, size)):
+            raise ValueError("Saved game has invalid regions")
+        if diagonals or regions:
+            key += (diagonals,) + tuple(regions)
+    if len(data) != start + 3 * cells + 4 * moves:
+        raise ValueError("Saved game has wrong size")
+    values = data[start:start + cells]
+    flags = data[start + cells:start + 2 * cells]
+    solution = data[start + 2 * cells:start + 3 * cells]
+    journal = data[start + 3 * cells:]
+    if max(values) > size or max(solution) > size or max(flags) > 7:
+        raise ValueError("Saved game has value out of range")
+    move_journal_cls.check_moves(journal, position, cells, size)
+    return (key, values, flags, solution, journal, position)
+
+
+def read_game(path: str = SAVE_FILE) -> bytes:
+    """Returns saved game, or None if there is no saved game."""
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+class GameSaver():
+    """Writes saved game in background thread.
+
+    save() only keeps newest data and wakes the thread, so the game never
+    waits for disk. If several saves come before the thread wakes up, only
+    the last one is written. File is written to temporary file and then
+    renamed, so saved game is never half written.
+    close() writes pending data and stops the thread, next save() starts it again.
+    """
+    def __init__(self, path: str = SAVE_FILE):
+        self.path = path
+        self._pending = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = None
+
+    def save(self, data: bytes):
+        with self._lock:
+            self._pending = data
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="GameSaver", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def close(self):
+        with self._lock:
+            thread = self._thread
+            self._stop = True
+        if thread is not None:
+            self._wake.set()
+            thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                data = self._pending
+                self._pending = None
+                stop = self._stop
+            if data is not None:
+                self._write(data)
+            if stop:
+                break
+
+    def _write(self, data: bytes):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
@@ -1,18 +1,42 @@
 import os
 
 
+MAX_BOARD_SIZE = 25  # Values are shown as 1-9 and then letters A-P
+
+# Sudoku variants (geometry of every variant is built in variant_cls)
+CLASSIC = "classic"  # Rows, columns and rectangular blocks
+DIAGONAL = "x"  # Classic + both main diagonals (Sudoku-X)
+JIGSAW = "jigsaw"  # Rows, columns and irregular regions
+VARIANTS = (CLASSIC, DIAGONAL, JIGSAW)
+
+
+def block_height(size: int) -> int:
+    """Returns height of block for board with 'size' values.
+    Block height is the largest divisor of size not bigger than square root
+    of size, block width is size / height (4=2x2, 6=3x2, 8=4x2, 9=3x3,
+    12=4x3, 16=4x4, 25=5x5). Returns 1 if size is prime (no valid blocks).
+    """
+    height = 1
+    divisor = 2
+    while divisor * divisor <= size:
+        if size % divisor == 0:
+            height = divisor
+        divisor += 1
+    return height
+
+
 class Setting():
     """Loads the game settings from the 'settings.txt' file.
     """
     def __init__(self):
         """Sudoku settings:
             _win_size = Window size
-            _block_size = Number of elements in block (4, 6, 9)
-            _game_size = Number of blocks in game (1, 2, 4, 6, 9)            
+            _block_size = Number of elements in block (4, 6, 8, 9, 12, 16, 25 ...)
+            _game_size = Number of blocks in game (same as _block_size)
         """
         # Internal variables 
-        self._allowed_block_size = [6, 9]
-        self._allowed_game_size = [6, 9]
+        self._allowed_block_size = [size for size in range(4, MAX_BOARD_SIZE + 1) if block_height(size) > 1]
+        self._allowed_game_size = list(self._allowed_block_size)
         self._game_surface_padding_top = 150
         self._game_surface_padding_bottom = 50
         self._game_surface_zoom_level = 0  # Zoom 0-5  0=max zoom (default)
@@ -39,6 +63,7 @@ class Setting():
         self._buttons_image_folder = "images/set0/"  # Image folder with button png files
         self._selection_rectangle_thicknes = 2  # Thicknes of rectangle on selected cell
         self._selection_rectangle_color = "#000000"  # Color of rectangle on selected cell
+        self._game_variant = CLASSIC  # Sudoku variant (classic, x, jigsaw)
         # Try to load the data, if the file does not exist, load the default data.
         result = self.load_data_from_file()
         if not result:
@@ -105,6 +130,7 @@ class Setting():
             data += f"_buttons_image_folder={self._buttons_image_folder}\n"
             data += f"_selection_rectangle_thicknes={self._selection_rectangle_thicknes}\n"
             data += f"_selection_rectangle_color={self._selection_rectangle_color}\n"
+            data += f"_game_variant={self._game_variant}\n"
 
         # Load to lines_to_write all language records from settings.txt
         lines_to_write = ""
@@ -405,6 +431,17 @@ class Setting():
                 missing = missing + ":_selection_rectangle_color"
         else:
             missing = missing + ":_selection_rectangle_color"
+        # Setup _game_variant
+        index_list = [idx for idx, value in enumerate(data) if value[0] == "_game_variant"]
+        if index_list:
+            index = index_list[0]
+            _game_variant = data[index][1].strip()
+            if _game_variant in VARIANTS:
+                self._game_variant = _game_variant
+            else:
+                missing = missing + ":_game_variant"
+        else:
+            missing = missing + ":_game_variant"
 
 
         if missing:
@@ -480,6 +517,8 @@ class Setting():
             self._game_size = 4
         if property_ == "_win_color" or property_ == "":
             self._win_color = "#000000"
+        if property_ == "_game_variant" or property_ == "":
+            self._game_variant = CLASSIC
 
     @property
     def win_size(self) -> tuple:
@@ -538,54 +577,22 @@ class Setting():
 
     @property
     def elements_in_block_x(self) -> int:
-        elements = 0
-        if self._block_size == 4:
-            elements = 2
-        elif self._block_size == 6:
-            elements = 3
-        elif self._block_size == 9:
-            elements = 3
+        elements = self._block_size // block_height(self._block_size)
         return elements
 
     @property
     def elements_in_block_y(self) -> int:
-        elements = 0
-        if self._block_size == 4:
-            elements = 2
-        elif self._block_size == 6:
-            elements = 2
-        elif self._block_size == 9:
-            elements = 3
+        elements = block_height(self._block_size)
         return elements
 
     @property
     def blocks_in_game_x(self) -> int:
-        blocks = 0
-        if self._game_size == 1:
-            blocks = 1
-        elif self._game_size == 2:
-            blocks = 2
-        elif self._game_size == 4:
-            blocks = 2
-        elif self._game_size == 6:
-            blocks = 2
-        elif self._game_size == 9:
-            blocks = 3
+        blocks = block_height(self._game_size)
         return blocks
 
     @property
     def blocks_in_game_y(self) -> int:
-        blocks = 0
-        if self._game_size == 1:
-            blocks = 1
-        elif self._game_size == 2:
-            blocks = 1
-        elif self._game_size == 4:
-            blocks = 2
-        elif self._game_size == 6:
-            blocks = 3
-        elif self._game_size == 9:
-            blocks = 3
+        blocks = self._game_size // block_height(self._game_size)
         return blocks
 
     @property
@@ -874,6 +881,16 @@ class Setting():
         else:
             raise ValueError("Color must have a value in HEX format (#XXXXXX) or RGB(XXX,XXX,XXX)")
 
+    @property
+    def game_variant(self) -> str:
+        return self._game_variant
+
+    @game_variant.setter
+    def game_variant(self, value: str):
+        if value not in VARIANTS:
+            raise ValueError(f"Game variant can only be values {VARIANTS}")
+        self._game_variant = value
+
     @property
     def win_scale_x(self) -> float:
         value = self.win_size[0] / 800
@@ -961,6 +978,7 @@ if __name__ == "__main__":
                 stt.buttons_image_folder = self.value_entry[15].get()
                 stt.selection_rectangle_thicknes = int(self.value_entry[16].get())
                 stt.selection_rectangle_color = self.value_entry[17].get()
+                stt.game_variant = self.value_entry[18].get().strip()
             except Exception as e:
                 self.lbl_error["text"] = str(e)
                 return
@@ -986,7 +1004,8 @@ if __name__ == "__main__":
                             ["_hint_animation_speed", str(stt.hint_animation_speed), "Values ​​(0 - 10,000). It determines the speed of each step when the game moves through the cells in search of a solution. This only affects the animation the user sees when asking for help."],
                             ["_buttons_image_folder", str(stt.buttons_image_folder), "A folder containing png files for displaying fields in Sudoku. (/image/set0/)"],
                             ["_selection_rectangle_thicknes", str(stt.selection_rectangle_thicknes), "Values (0 - 30). The thickness of the square that marks the cell selection."],
-                            ["_selection_rectangle_color", str(stt.selection_rectangle_color), "The color of the square that marks the cell selection."]
+                            ["_selection_rectangle_color", str(stt.selection_rectangle_color), "The color of the square that marks the cell selection."],
+                            ["_game_variant", str(stt.game_variant), "Values (classic, x, jigsaw). Classic sudoku, Sudoku-X (both diagonals have every value once) or jigsaw (irregular regions instead of blocks)."]
                             ]
             return config_items
 
@@ -0,0 +1,239 @@
+import time
+import geometry_cls
+import candidates_cls
+import dlx_solver_cls
+import backtrack_solver_cls
+import parallel_solver_cls
+
+
+OPERATIONS = ("solve", "count", "next_step")
+
+
+class SolverBackend():
+    """Interface of solver backend.
+
+    values = flat list with cell values (0 = empty cell)
+    solve(values) -> list with solution, or None if there is no solution
+    count(values, limit, stop_event) -> number of solutions, counting stops
+        at limit; backends with can_stop stop search when stop_event (e.g.
+        backtrack_solver_cls.NodeLimit) is set and return solutions counted so far
+    next_step(values) -> (index, value) for one empty cell, or None if
+        backend cannot find step
+    Backend supports only operations listed in 'operations'.
+    """
+    name = ""
+    operations = ()
+    min_size = 0  # Backend is used only for boards with at least this many values
+    can_stop = False  # count() checks stop_event in every search node
+
+    def __init__(self, geometry: geometry_cls.Geometry, workers: int = None):
+        self.geometry = geometry
+
+    def solve(self, values: list) -> list:
+        raise NotImplementedError
+
+    def count(self, values: list, limit: int = 2, stop_event=None) -> int:
+        raise NotImplementedError
+
+    def next_step(self, values: list) -> tuple:
+        # Take value from solution for empty cell with fewest candidates
+        solution = self.solve(values)
+        if solution is None:
+            return None
+        cand = candidates_cls.CandidateMasks(self.geometry)
+        cand.load(values)
+        best_index = cand.fewest_candidates_cell()
+        if best_index < 0:
+            return None
+        return (best_index, solution[best_index])
+
+    def shutdown(self):
+        pass
+
+
+class PropagationBackend(SolverBackend):
+    """Naked and hidden singles only, can find next step but can't solve every board."""
+    name = "propagation"
+    operations = ("next_step",)
+
+    def __init__(self, geometry: geometry_cls.Geometry, workers: int = None):
+        super().__init__(geometry)
+        self._cand = candidates_cls.CandidateMasks(geometry)
+
+    def next_step(self, values: list) -> tuple:
+        cand = self._cand
+        cand.load(values)
+        if cand.has_conflicts():
+            return None
+        is_consistent, assigned = cand.propagate()
+        if not is_consistent or not assigned:
+            return None
+        # First assignment depends only on original board
+        return (assigned[0], cand.values[assigned[0]])
+
+
+class BacktrackingBackend(SolverBackend):
+    name = "backtracking"
+    operations = ("solve", "count", "next_step")
+    can_stop = True
+
+    def __init__(self, geometry: geometry_cls.Geometry, workers: int = None):
+        super().__init__(geometry)
+        # Stop event is checked in every node (NodeLimit), there is no check without it
+        self._solver = backtrack_solver_cls.BacktrackingSolver(geometry, check_every=1)
+
+    def solve(self, values: list) -> list:
+        solutions = self._solver.solve(values, 1)
+        return solutions[0] if solutions else None
+
+    def count(self, values: list, limit: int = 2, stop_event=None) -> int:
+        return self._solver.count(values, limit, stop_event)
+
+
+class DLXBackend(SolverBackend):
+    name = "exact_cover"
+    operations = ("solve", "count", "next_step")
+
+    def __init__(self, geometry: geometry_cls.Geometry, workers: int = None):
+        super().__init__(geometry)
+        self._solver = dlx_solver_cls.DLXSolver(geometry)
+
+    def solve(self, values: list) -> list:
+        solutions = self._solver.solve(values, 1)
+        return solutions[0] if solutions else None
+
+    def count(self, values: list, limit: int = 2, stop_event=None) -> int:
+        return self._solver.count(values, limit)
+
+
+class ParallelBackend(SolverBackend):
+    """Process pool is too slow to start for small boards, so it is used only for large ones."""
+    name = "parallel"
+    operations = ("solve", "count")
+    min_size = 16
+
+    def __init__(self, geometry: geometry_cls.Geometry, workers: int = None):
+        super().__init__(geometry)
+        self._solver = parallel_solver_cls.ParallelSolver(geometry, workers)
+
+    def solve(self, values: list) -> list:
+        solutions = self._solver.solve(values, 1)
+        return solutions[0] if solutions else None
+
+    def count(self, values: list, limit: int = 2, stop_event=None) -> int:
+        return self._solver.count(values, limit)
+
+    def shutdown(self):
+        self._solver.shutdown()
+
+
+class SolverRegistry():
+    """Keeps solver backends and chooses fastest one for every operation.
+
+    calibrate() measures every backend on sample boards of one geometry and
+    records backends ordered from fastest to slowest for each operation.
+    Until geometry is calibrated, backends are used in registration order.
+    If backend can't find next step, next backend in order is asked.
+    All jigsaw layouts of one board size share calibration (backends are
+    equally fast on them), and forget() drops backends of layout that is
+    not used any more.
+    workers = number of processes for parallel backend (1 = parallel backend is not used)
+    """
+    def __init__(self, workers: int = None):
+        self.workers = workers
+        self._backend_classes = []
+        self._backends = {}  # geometry key -> {backend name: backend}
+        self._ranking = {}  # calibration key -> {operation: [backend names, fastest first]}
+        self.timings = {}  # calibration key -> {operation: {backend name: seconds}}
+        for backend_class in (DLXBackend, BacktrackingBackend, PropagationBackend, ParallelBackend):
+            self.register(backend_class)
+
+    def register(self, backend_class: type):
+        self._backend_classes.append(backend_class)
+        self._backends = {}
+        self._ranking = {}
+
+    def backends(self, geometry: geometry_cls.Geometry) -> dict:
+        """Returns {backend name: backend} with backends usable for this geometry."""
+        key = geometry.key
+        if key not in self._backends:
+            backends = {}
+            for backend_class in self._backend_classes:
+                if geometry.size < backend_class.min_size:
+                    continue
+                if backend_class is ParallelBackend and self.workers == 1:
+                    continue
+                backends[backend_class.name] = backend_class(geometry, self.workers)
+            self._backends[key] = backends
+        return self._backends[key]
+
+    def forget(self, geometry: geometry_cls.Geometry):
+        """Shuts down and drops backends of geometry."""
+        for backend in self._backends.pop(geometry.key, {}).values():
+            backend.shutdown()
+
+    def _calibration_key(self, geometry: geometry_cls.Geometry) -> tuple:
+        # Board size and variant, without regions of jigsaw layout
+        return geometry.key[:5] + (geometry.regions is not None,)
+
+    def is_calibrated(self, geometry: geometry_cls.Geometry) -> bool:
+        return self._calibration_key(geometry) in self._ranking
+
+    def calibrate(self, geometry: geometry_cls.Geometry, boards: list) -> dict:
+        """Measures all backends on 'boards'.
+        Returns {operation: name of fastest backend}.
+        """
+        backends = self.backends(geometry)
+        timings = {}
+        ranking = {}
+        for operation in OPERATIONS:
+            timings[operation] = {}
+            for name, backend in backends.items():
+                if operation not in backend.operations:
+                    continue
+                method = getattr(backend, operation)
+                # Warm up (caches, worker processes)
+                method(boards[0])
+                start = time.perf_counter()
+                for board in boards:
+                    method(board)
+                timings[operation][name] = time.perf_counter() - start
+            ranking[operation] = sorted(timings[operation], key=timings[operation].get)
+        self.timings[self._calibration_key(geometry)] = timings
+        self._ranking[self._calibration_key(geometry)] = ranking
+        return {operation: names[0] for operation, names in ranking.items() if names}
+
+    def _ordered(self, geometry: geometry_cls.Geometry, operation: str) -> list:
+        backends = self.backends(geometry)
+        ranking = self._ranking.get(self._calibration_key(geometry))
+        if ranking:
+            return [backends[name] for name in ranking[operation]]
+        return [backend for backend in backends.values() if operation in backend.operations]
+
+    def best(self, geometry: geometry_cls.Geometry, operation: str) -> SolverBackend:
+        return self._ordered(geometry, operation)[0]
+
+    def solve(self, geometry: geometry_cls.Geometry, values: list) -> list:
+        return self.best(geometry, "solve").solve(values)
+
+    def count(self, geometry: geometry_cls.Geometry, values: list, limit: int = 2, stop_event=None) -> int:
+        """Returns number of solutions, counting stops at 'limit'.
+        With 'stop_event' fastest backend that can stop (can_stop) counts,
+        and search stops when stop_event is set (see SolverBackend).
+        """
+        if stop_event is None:
+            return self.best(geometry, "count").count(values, limit)
+        backend = next(backend for backend in self._ordered(geometry, "count") if backend.can_stop)
+        return backend.count(values, limit, stop_event)
+
+    def next_step(self, geometry: geometry_cls.Geometry, values: list) -> tuple:
+        for backend in self._ordered(geometry, "next_step"):
+            step = backend.next_step(values)
+            if step is not None:
+                return step
+        return None
+
+    def shutdown(self):
+        for backends in self._backends.values():
+            for backend in backends.values():
+                backend.shutdown()
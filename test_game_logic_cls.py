@@ -0,0 +1,23 @@
+import unittest
+import settings_cls
+import game_logic_cls
+
+
+class StartPuzzleTest(unittest.TestCase):
+    def setUp(self):
+        self.stt = settings_cls.Setting()
+        self.stt.game_size = 9
+        self.logic = game_logic_cls.SudokuGameLogic(self.stt, workers=1)
+
+    def tearDown(self):
+        self.logic.close()
+
+    def test_conflicting_puzzle_after_equivalent_valid_puzzle(self):
+        # Both puzzles have the same canonical form, the second one must not use cache entry of the first
+        self.assertEqual(self.logic.start_puzzle(list(range(1, 10)) + [0] * 72), 2)
+        self.assertEqual(self.logic.start_puzzle([1] * 9 + [0] * 72), 0)
+        self.assertFalse(self.logic.active_game)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import geometry_cls
+import grid_generator_cls
+import settings_cls
+
+
+# Sudoku variants are defined in settings_cls, so settings don't import grid generation
+CLASSIC = settings_cls.CLASSIC
+DIAGONAL = settings_cls.DIAGONAL
+JIGSAW = settings_cls.JIGSAW
+VARIANTS = settings_cls.VARIANTS
+
+JIGSAW_TRIES = 10  # Tries to swap cells between regions per cell of board (more tries move regions back and forth)
+
+
+def get_variant_geometry(variant: str, elements_x: int, elements_y: int, block_x: int, block_y: int, rng) -> tuple:
+    """Returns (geometry, solved grid) of variant.
+    Jigsaw regions are random (from 'rng') and grid is a solution valid for
+    them, for other variants grid is None.
+    """
+    if variant == DIAGONAL:
+        return (geometry_cls.get_geometry(elements_x, elements_y, block_x, block_y, diagonals=True), None)
+    if variant == JIGSAW:
+        classic = geometry_cls.get_geometry(elements_x, elements_y, block_x, block_y)
+        # Swaps are rare in regular patterns of seed grids, so seed pattern is mixed first
+        grid = grid_generator_cls.GridGenerator(classic).mixed_grid(rng)
+        regions = random_regions(classic, grid, rng)
+        return (geometry_cls.get_geometry(elements_x, elements_y, block_x, block_y, regions), grid)
+    return (geometry_cls.get_geometry(elements_x, elements_y, block_x, block_y), None)
+
+
+def variant_of(geometry: geometry_cls.Geometry) -> str:
+    if geometry.regions is not None:
+        return JIGSAW
+    if geometry.diagonals:
+        return DIAGONAL
+    return CLASSIC
+
+
+def random_regions(geometry: geometry_cls.Geometry, grid: list, rng, tries: int = None) -> tuple:
+    """Returns region of every cell for jigsaw board.
+    Starts with blocks of classic geometry and swaps cells with the same
+    value in 'grid' on borders of two regions, so both regions keep their
+    size and still have every value once, and 'grid' stays solved. Swap is
+    kept only if both regions stay connected, which is checked only around
+    swapped cells, so every try takes the same short time.
+    tries = number of tried swaps (default JIGSAW_TRIES per cell)
+    """
+    geo = geometry
+    cells = geo.cells
+    width = geo.elements_x
+    regions = [geo.cell_units[index][2] - geo.block_units.start for index in range(0, cells)]
+    neighbours = []
+    for index in range(0, cells):
+        x, y = geo.position(index)
+        around = []
+        if x > 0:
+            around.append(index - 1)
+        if x < width - 1:
+            around.append(index + 1)
+        if y > 0:
+            around.append(index - width)
+        if y < geo.elements_y - 1:
+            around.append(index + width)
+        neighbours.append(around)
+    # Cell of every value in every region
+    cell_of = [[0] * (geo.size + 1) for region in geo.block_units]
+    for index in range(0, cells):
+        cell_of[regions[index]][grid[index]] = index
+    if tries is None:
+        tries = cells * JIGSAW_TRIES
+    for step in range(0, tries):
+        first = rng.randrange(0, cells)
+        region_a = regions[first]
+        other_regions = [regions[cell] for cell in neighbours[first] if regions[cell] != region_a]
+        if not other_regions:
+            continue
+        region_b = rng.choice(other_regions)
+        # Region B has value of first cell once, that cell goes the other way
+        value = grid[first]
+        second = cell_of[region_b][value]
+        # Both cells have to touch the region they join, without the cell that leaves it
+        if not any(regions[near] == region_a for near in neighbours[second] if near != first):
+            continue
+        if not any(regions[near] == region_b for near in neighbours[first] if near != second):
+            continue
+        if not _stays_connected(geo, regions, first) or not _stays_connected(geo, regions, second):
+            continue
+        regions[first] = region_b
+        regions[second] = region_a
+        cell_of[region_a][value] = second
+        cell_of[region_b][value] = first
+    return tuple(regions)
+
+
+def _stays_connected(geometry: geometry_cls.Geometry, regions: list, index: int) -> bool:
+    """Returns True if region of cell stays connected without the cell.
+    Neighbours from the same region have to be connected inside 3x3 cells
+    around it, then every path through the cell can go around it. Some
+    cells that could be removed are rejected, but the check is local.
+    """
+    x, y = geometry.position(index)
+    region = regions[index]
+    near = set()
+    for near_y in range(max(0, y - 1), min(geometry.elements_y, y + 2)):
+        for near_x in range(max(0, x - 1), min(geometry.elements_x, x + 2)):
+            if (near_x, near_y) != (x, y) and regions[geometry.index(near_x, near_y)] == region:
+                near.add((near_x, near_y))
+    sides = [cell for cell in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)) if cell in near]
+    if not sides:
+        return False
+    seen = {sides[0]}
+    stack = [sides[0]]
+    while stack:
+        cell_x, cell_y = stack.pop()
+        for cell in ((cell_x - 1, cell_y), (cell_x + 1, cell_y), (cell_x, cell_y - 1), (cell_x, cell_y + 1)):
+            if cell in near and cell not in seen:
+                seen.add(cell)
+                stack.append(cell)
+    return all(cell in seen for cell in sides)